@@ -1,18 +1,27 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from typing import Any, Dict, List, Optional
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Union
 from implementation import (
-    AlternativeDataFusion, GraphNeuralNetwork, FederatedCreditScoring, DynamicCreditScoring,
-    DecentralizedKYC, DocumentVerifier, AMLAnomalyDetector, BiometricKYC, ComplianceSmartContract,
+    AlternativeDataFusion, GraphNeuralNetwork, SparseAdjacency, FederatedCreditScoring, DynamicCreditScoring,
+    DynamicScoreStore, DecentralizedKYC, DocumentVerifier, AMLAnomalyDetector, BiometricKYC, ComplianceSmartContract,
     SentimentAnalyzer, LifestyleSegmenter, StabilityForecaster, EthicalAI, utility_function,
     ESGDataAggregator, ESGScorer, ImpactMeasurer, ESGPortfolioOptimizer, ESGVisualizer,
-    LoanRecommender, LoanStructurer, LoanGuidanceChatbot, FinancialLiteracyGame, CrossSelling
+    LoanRecommender, LoanStructurer, LoanGuidanceChatbot, FinancialLiteracyGame, CrossSelling,
+    iter_text_chunks
 )
 
 # Initialize Flask app and enable CORS for cross-origin requests.
 app = Flask(__name__)
 CORS(app)
 
+# Persistent component state lives next to this module, whatever the working directory.
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+# Optional user-defined DocumentVerifier rules (JSON: rule name -> character-class spec).
+DOCUMENT_RULES_PATH = os.environ.get('DOCUMENT_RULES_PATH', os.path.join(DATA_DIR, 'document_rules.json'))
+
 
 class MicroFinanceBackend:
     """
@@ -23,14 +32,20 @@ class MicroFinanceBackend:
         self.alt_data_fusion: AlternativeDataFusion = AlternativeDataFusion(input_size=5)
         self.gnn: GraphNeuralNetwork = GraphNeuralNetwork(size=5)
         self.federated_scoring: FederatedCreditScoring = FederatedCreditScoring(num_institutions=3)
-        self.dynamic_scoring: DynamicCreditScoring = DynamicCreditScoring()
+        self.dynamic_scores: DynamicScoreStore = DynamicScoreStore()
 
         # Compliance Automation Components
-        self.kyc: DecentralizedKYC = DecentralizedKYC()
-        self.doc_verifier: DocumentVerifier = DocumentVerifier()
+        os.makedirs(DATA_DIR, exist_ok=True)
+        self.kyc: DecentralizedKYC = DecentralizedKYC(log_path=os.path.join(DATA_DIR, 'kyc_chain.log'))
+        self.doc_verifier: DocumentVerifier = (
+            DocumentVerifier.from_file(DOCUMENT_RULES_PATH) if os.path.exists(DOCUMENT_RULES_PATH)
+            else DocumentVerifier()
+        )
         self.aml_detector: AMLAnomalyDetector = AMLAnomalyDetector(size=5)
-        self.biometric_kyc: BiometricKYC = BiometricKYC()
+        self.biometric_kyc: BiometricKYC = BiometricKYC(store_path=os.path.join(DATA_DIR, 'biometric_templates'))
         self.compliance_contract: ComplianceSmartContract = ComplianceSmartContract()
+        # Running mean cost (ms) of each read-only compliance check, used to order batch checks.
+        self.check_costs: Dict[str, float] = {}
 
         # Behavioral Analysis Components
         self.sentiment_analyzer: SentimentAnalyzer = SentimentAnalyzer(size=3)
@@ -52,29 +67,38 @@ class MicroFinanceBackend:
         self.game: FinancialLiteracyGame = FinancialLiteracyGame()
         self.cross_selling: CrossSelling = CrossSelling()
 
-    def assess_creditworthiness(self, data: List[float], social_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def assess_creditworthiness(self, data: List[float], social_data: Optional[Dict[str, Any]] = None,
+                                user_id: Optional[Any] = None) -> Dict[str, Any]:
         """
         Assess creditworthiness using alternative data and optional social network data.
         
         Args:
-            data (List[float]): List of financial features.
-            social_data (Optional[Dict[str, Any]]): Optional dict with 'nodes' and 'connections'.
+            data (List[float]): List of financial features, or a list of feature lists
+                for a multi-applicant request.
+            social_data (Optional[Dict[str, Any]]): Optional dict with 'nodes' and either a dense
+                'connections' matrix or an 'edges' list of [src, dst, weight].
+            user_id (Optional[Any]): User identifier keying the dynamic score (a list of ids
+                for a multi-applicant request).
         
         Returns:
             Dict[str, Any]: A dictionary containing various credit scores.
+
+        Raises:
+            ValueError: If `user_id` does not match the shape of `data`.
         """
+        if data and isinstance(data[0], (list, tuple)):
+            return self._assess_creditworthiness_batch(data, social_data, user_id)
+        if isinstance(user_id, (list, tuple)):
+            raise ValueError("A list of user ids requires a list of applicants")
         alt_score = self.alt_data_fusion.predict(data)
         if social_data:
-            nodes: List[float] = social_data.get('nodes', [])
-            connections: List[List[float]] = social_data.get('connections', [])
-            gnn_score = self.gnn.predict(nodes, connections)
+            gnn_score = self._social_scores(social_data)
             final_score = (alt_score + sum(gnn_score) / len(gnn_score)) / 2
         else:
             final_score = alt_score
             gnn_score = None
         federated_score = self.federated_scoring.predict(data)
-        self.dynamic_scoring.update(data, final_score)
-        dynamic_score = self.dynamic_scoring.predict()
+        dynamic_score = self._dynamic_score(user_id, data, final_score)
         return {
             'alternative_score': alt_score,
             'gnn_score': gnn_score,
@@ -83,26 +107,109 @@ class MicroFinanceBackend:
             'dynamic_score': dynamic_score
         }
 
-    def verify_compliance(self, user_data: Any, document_text: str, transaction_data: List[float],
+    def _dynamic_score(self, user_id: Optional[Any], data: List[float], value: float) -> float:
+        """
+        Folds a new score into the user's time-decayed score.
+        Anonymous requests get a fresh score with no history.
+        
+        Args:
+            user_id (Optional[Any]): User identifier.
+            data (List[float]): Financial features of the request.
+            value (float): New score value to blend in.
+        
+        Returns:
+            float: Normalized dynamic credit score.
+        """
+        if user_id is None:
+            scoring = DynamicCreditScoring()
+            scoring.update(data, value)
+            return scoring.predict()
+        return self.dynamic_scores.update(user_id, value)
+
+    def _social_scores(self, social_data: Dict[str, Any]) -> List[float]:
+        """
+        Runs the GNN over the social graph, using the sparse path when an edge list is given.
+        
+        Args:
+            social_data (Dict[str, Any]): Dict with 'nodes' and either 'connections' or 'edges'.
+        
+        Returns:
+            List[float]: Social influence score per node.
+        """
+        nodes: List[float] = social_data.get('nodes', [])
+        if 'edges' in social_data:
+            connections: Any = SparseAdjacency.from_edges(social_data['edges'], n_nodes=len(nodes))
+        else:
+            connections = social_data.get('connections', [])
+        return self.gnn.predict(nodes, connections)
+
+    def _assess_creditworthiness_batch(self, data: List[List[float]],
+                                       social_data: Optional[Dict[str, Any]] = None,
+                                       user_ids: Optional[List[Any]] = None) -> Dict[str, Any]:
+        """
+        Assess creditworthiness for several applicants, scoring alternative data in one vectorized pass.
+        
+        Args:
+            data (List[List[float]]): One list of financial features per applicant.
+            social_data (Optional[Dict[str, Any]]): Optional dict with 'nodes' and either a dense
+                'connections' matrix or an 'edges' list of [src, dst, weight].
+            user_ids (Optional[List[Any]]): Optional user identifier per applicant.
+        
+        Returns:
+            Dict[str, Any]: A dictionary containing per-applicant lists of credit scores.
+
+        Raises:
+            ValueError: If `user_ids` is not a list with one id per applicant.
+        """
+        if user_ids is not None and (not isinstance(user_ids, (list, tuple)) or len(user_ids) != len(data)):
+            raise ValueError(f"Expected 'user_id' to be a list of {len(data)} ids, one per applicant")
+        alt_scores: List[float] = self.alt_data_fusion.predict_batch(data, exact=True).tolist()
+        if social_data:
+            gnn_score = self._social_scores(social_data)
+            gnn_mean = sum(gnn_score) / len(gnn_score)
+            final_scores = [(alt_score + gnn_mean) / 2 for alt_score in alt_scores]
+        else:
+            final_scores = alt_scores
+            gnn_score = None
+        federated_scores: List[float] = self.federated_scoring.predict_batch(data).tolist()
+        ids = user_ids if user_ids is not None else [None] * len(data)
+        dynamic_scores = [
+            self._dynamic_score(user_id, row, final_score)
+            for user_id, row, final_score in zip(ids, data, final_scores)
+        ]
+        return {
+            'alternative_score': alt_scores,
+            'gnn_score': gnn_score,
+            'final_score': final_scores,
+            'federated_score': federated_scores,
+            'dynamic_score': dynamic_scores
+        }
+
+    def verify_compliance(self, user_data: Any, document_text: Union[str, Iterable[str]], transaction_data: List[float],
                           bio_data: Optional[List[float]] = None, contract_id: Optional[str] = None,
-                          conditions: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                          conditions: Optional[Dict[str, Any]] = None, segment: Optional[Any] = None) -> Dict[str, Any]:
         """
         Verifies compliance including KYC, document verification, AML, biometric KYC, and smart contract compliance.
         
         Args:
             user_data (Any): Data for KYC verification.
-            document_text (str): Document text to check.
+            document_text (Union[str, Iterable[str]]): Document text to check, or an iterable of
+                text chunks for streaming verification.
             transaction_data (List[float]): Transaction features for AML detection.
             bio_data (Optional[List[float]]): Optional biometric data.
             contract_id (Optional[str]): Optional contract ID.
             conditions (Optional[Dict[str, Any]]): Optional compliance conditions.
+            segment (Optional[Any]): Optional customer segment for the AML baseline.
         
         Returns:
             Dict[str, Any]: A dictionary with verification results.
         """
         kyc_verified = self.kyc.verify(user_data)
-        doc_verified = self.doc_verifier.check(document_text)
-        anomaly_detected = self.aml_detector.detect(transaction_data)
+        if isinstance(document_text, str):
+            doc_verified = self.doc_verifier.check(document_text)
+        else:
+            doc_verified = self.doc_verifier.check_stream(document_text)
+        anomaly_detected = self.aml_detector.detect(transaction_data, segment=segment)
         bio_verified = self.biometric_kyc.verify(user_data, bio_data) if bio_data else True
         contract_compliance = self.compliance_contract.check(contract_id, conditions) if contract_id and conditions else True
         compliance_status = kyc_verified and doc_verified and not anomaly_detected and bio_verified and contract_compliance
@@ -115,20 +222,85 @@ class MicroFinanceBackend:
             'compliance_status': compliance_status
         }
 
-    def analyze_behavior(self, features: List[float]) -> Dict[str, Any]:
+    def verify_compliance_batch(self, applicants: List[Dict[str, Any]], run_all: bool = False) -> List[Dict[str, Any]]:
+        """
+        Verifies compliance for several applicants.
+
+        Checks that change component state always run, so a batch leaves the same state
+        as per-applicant `verify_compliance` calls: KYC (every record is appended to the
+        chain, in one `verify_many` pass) and, in online mode, AML (which updates the
+        baselines). The read-only checks run in order of their measured mean cost and,
+        unless `run_all` is set for an audit, stop at the first failure; skipped checks
+        are None.
+        
+        Args:
+            applicants (List[Dict[str, Any]]): One dict per applicant with the same fields as
+                `verify_compliance` ('user_data', 'document_text', 'transaction_data' and optional
+                'bio_data', 'contract_id', 'conditions', 'segment').
+            run_all (bool, optional): Run every check even after the outcome is decided.
+        
+        Returns:
+            List[Dict[str, Any]]: Per-applicant results, with per-check timings in milliseconds
+                (the KYC timing is the batch time shared across applicants).
+        """
+        started = time.perf_counter()
+        kyc_results = self.kyc.verify_many([applicant.get('user_data') for applicant in applicants])
+        kyc_ms = (time.perf_counter() - started) * 1000 / max(len(applicants), 1)
+        results: List[Dict[str, Any]] = []
+        for applicant, kyc_verified in zip(applicants, kyc_results):
+            user_data = applicant.get('user_data')
+            bio_data = applicant.get('bio_data')
+            contract_id = applicant.get('contract_id')
+            conditions = applicant.get('conditions')
+            # result key -> (check, value that counts as a pass)
+            checks = {
+                'contract_compliance': (
+                    lambda: self.compliance_contract.check(contract_id, conditions) if contract_id and conditions else True,
+                    True),
+                'bio_verified': (lambda: self.biometric_kyc.verify(user_data, bio_data) if bio_data else True, True),
+                'anomaly_detected': (
+                    lambda: self.aml_detector.detect(applicant.get('transaction_data'), segment=applicant.get('segment')),
+                    False),
+                'doc_verified': (lambda: self.doc_verifier.check(applicant.get('document_text', '')), True),
+            }
+            mandatory = ['anomaly_detected'] if self.aml_detector.online else []
+            optional = sorted((key for key in checks if key not in mandatory),
+                              key=lambda key: self.check_costs.get(key, 0.0))
+            result: Dict[str, Any] = {key: None for key in checks}
+            result['kyc_verified'] = kyc_verified
+            timings: Dict[str, float] = {'kyc_verified': kyc_ms}
+            compliance_status = kyc_verified
+            for key in mandatory + optional:
+                if not compliance_status and not run_all and key not in mandatory:
+                    break
+                check, passing = checks[key]
+                started = time.perf_counter()
+                result[key] = check()
+                timings[key] = (time.perf_counter() - started) * 1000
+                previous = self.check_costs.get(key)
+                self.check_costs[key] = timings[key] if previous is None else 0.9 * previous + 0.1 * timings[key]
+                if result[key] != passing:
+                    compliance_status = False
+            result['compliance_status'] = compliance_status
+            result['timings_ms'] = timings
+            results.append(result)
+        return results
+
+    def analyze_behavior(self, features: List[float], user_id: Optional[Any] = None) -> Dict[str, Any]:
         """
         Analyze user behavior including sentiment, lifestyle segmentation, stability forecast,
         privacy protection, and utility score.
         
         Args:
             features (List[float]): List of behavioral features.
+            user_id (Optional[Any]): Optional user identifier keying the stability memory.
         
         Returns:
             Dict[str, Any]: Analysis results.
         """
         sentiment = self.sentiment_analyzer.predict(features)
         lifestyle_group = self.lifestyle_segmenter.predict(features)
-        stability = self.stability_forecaster.predict(features)
+        stability = self.stability_forecaster.predict(features, user_id)
         private_features = self.ethical_ai.veil(features)
         util_score = utility_function(features[0])  # For simplicity, using the first feature; can be extended.
         return {
@@ -210,7 +382,26 @@ class MicroFinanceBackend:
             training_data (Dict[str, Any]): Data for model training.
         """
         if 'alt_data' in training_data and 'targets' in training_data:
-            self.alt_data_fusion.train(training_data['alt_data'], training_data['targets'])
+            batch_size = training_data.get('batch_size', 256)
+            # Mean-gradient batches: scale the per-sample SGD rate by the batch size so a
+            # batch moves the weights about as far as the old per-sample updates did.
+            lr = training_data.get('lr', 0.01 * min(batch_size, len(training_data['targets'])))
+            self.alt_data_fusion.train_batch(
+                training_data['alt_data'], training_data['targets'],
+                epochs=training_data.get('epochs', 50),
+                lr=lr,
+                batch_size=batch_size,
+                validation_split=training_data.get('validation_split', 0.1)
+            )
+        if 'federated_data' in training_data and 'federated_targets' in training_data:
+            # One dataset and target list per institution; lr is per-sample (see FederatedCreditScoring.train).
+            self.federated_scoring.train(
+                training_data['federated_data'], training_data['federated_targets'],
+                epochs=training_data.get('epochs', 50),
+                rounds=training_data.get('rounds', 1),
+                lr=training_data.get('federated_lr', 0.01),
+                weight_by_samples=training_data.get('weight_by_samples', False)
+            )
         # Additional model training logic can be added here.
 
     def set_compliance_rule(self, contract_id: str, conditions: Dict[str, Any]) -> None:
@@ -247,14 +438,18 @@ def assess_creditworthiness_endpoint() -> Any:
     """
     API endpoint to assess creditworthiness.
     
-    Expects JSON with 'data' (required) and optional 'social_data'.
+    Expects JSON with 'data' (required) and optional 'social_data' and 'user_id'.
     """
     req_data = request.json
     data = req_data.get('data')
     social_data = req_data.get('social_data')
+    user_id = req_data.get('user_id')
     if not data:
         return jsonify({'error': 'Missing data'}), 400
-    result = backend.assess_creditworthiness(data, social_data)
+    try:
+        result = backend.assess_creditworthiness(data, social_data, user_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(result)
 
 
@@ -264,33 +459,73 @@ def verify_compliance_endpoint() -> Any:
     API endpoint to verify compliance.
     
     Expects JSON with 'user_data', 'document_text', 'transaction_data' (required),
-    and optional 'bio_data', 'contract_id', and 'conditions'.
+    and optional 'bio_data', 'contract_id', 'conditions' and 'segment'.
+    Large documents can instead be sent as multipart form data: a 'document' file part,
+    which is verified as a stream, plus the other fields as form values. The structured
+    fields ('user_data', 'transaction_data', 'bio_data', 'conditions') are JSON-encoded;
+    'contract_id' and 'segment' are plain strings.
     """
-    req_data = request.json
+    if 'document' in request.files:
+        req_data = dict(request.form.items())
+        for key in ('user_data', 'transaction_data', 'bio_data', 'conditions'):
+            if key in req_data:
+                try:
+                    req_data[key] = json.loads(req_data[key])
+                except ValueError:
+                    return jsonify({'error': f"Form field '{key}' is not valid JSON"}), 400
+        req_data['document_text'] = iter_text_chunks(request.files['document'].stream)
+    else:
+        req_data = request.json
     user_data = req_data.get('user_data')
     document_text = req_data.get('document_text')
     transaction_data = req_data.get('transaction_data')
     bio_data = req_data.get('bio_data')
     contract_id = req_data.get('contract_id')
     conditions = req_data.get('conditions')
+    segment = req_data.get('segment')
     if not user_data or not document_text or not transaction_data:
         return jsonify({'error': 'Missing required data'}), 400
-    result = backend.verify_compliance(user_data, document_text, transaction_data, bio_data, contract_id, conditions)
+    result = backend.verify_compliance(user_data, document_text, transaction_data, bio_data, contract_id,
+                                       conditions, segment)
     return jsonify(result)
 
 
+@app.route('/verify_compliance_batch', methods=['POST'])
+def verify_compliance_batch_endpoint() -> Any:
+    """
+    API endpoint to verify compliance for many applicants.
+    
+    Expects JSON with 'applicants' (required): a list of objects with the same fields as
+    /verify_compliance. Optional 'run_all' runs every check for audit purposes.
+    """
+    req_data = request.json
+    applicants = req_data.get('applicants')
+    run_all = bool(req_data.get('run_all', False))
+    if not applicants:
+        return jsonify({'error': 'Missing applicants'}), 400
+    missing = [i for i, a in enumerate(applicants)
+               if not a.get('user_data') or not a.get('document_text') or not a.get('transaction_data')]
+    if missing:
+        return jsonify({'error': 'Missing required data', 'applicants': missing}), 400
+    return jsonify(backend.verify_compliance_batch(applicants, run_all))
+
+
 @app.route('/analyze_behavior', methods=['POST'])
 def analyze_behavior_endpoint() -> Any:
     """
     API endpoint to analyze user behavior.
     
-    Expects JSON with 'features' (required).
+    Expects JSON with 'features' (required) and optional 'user_id'.
     """
     req_data = request.json
     features = req_data.get('features')
+    user_id = req_data.get('user_id')
     if not features:
         return jsonify({'error': 'Missing features'}), 400
-    result = backend.analyze_behavior(features)
+    try:
+        result = backend.analyze_behavior(features, user_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify(result)
 
 
@@ -337,7 +572,9 @@ def train_models_endpoint() -> Any:
     """
     API endpoint to train models.
     
-    Expects JSON with 'training_data' (required).
+    Expects JSON with 'training_data' (required): 'alt_data' and 'targets' train the
+    alternative-data model; 'federated_data' and 'federated_targets' (one dataset per
+    institution) train the federated model.
     """
     req_data = request.json
     training_data = req_data.get('training_data')
@@ -375,7 +612,10 @@ def enroll_biometric_endpoint() -> Any:
     bio_data = req_data.get('bio_data')
     if not user_id or not bio_data:
         return jsonify({'error': 'Missing user ID or biometric data'}), 400
-    backend.enroll_biometric(user_id, bio_data)
+    try:
+        backend.enroll_biometric(user_id, bio_data)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify({'message': 'Biometric data enrolled successfully'})
 
 
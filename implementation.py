@@ -10,12 +10,27 @@ It includes core components for:
     - AI-Driven Loan Recommendation System
 
 This implementation relies on Python’s built-in features and minimal external modules.
+NumPy is used for the batch (matrix) code paths.
 """
 
 import random
 import math
+import codecs
+import copy
 import hashlib
-from typing import List, Dict, Any, Optional, Tuple
+import itertools
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
+
+import numpy as np
 
 # ------------------------
 # Core Helper Functions
@@ -34,6 +49,19 @@ def sigmoid(x: float) -> float:
     return 1 / (1 + math.exp(-x))
 
 
+def sigmoid_array(x: np.ndarray) -> np.ndarray:
+    """
+    Element-wise sigmoid for NumPy arrays, using the same formula as `sigmoid`.
+
+    Args:
+        x (np.ndarray): The input values.
+
+    Returns:
+        np.ndarray: The sigmoid outputs.
+    """
+    return 1 / (1 + np.exp(-x))
+
+
 def relu(x: float) -> float:
     """
     Returns x if positive, else 0 (ReLU activation).
@@ -76,6 +104,11 @@ def normalize(data: List[float]) -> List[float]:
     return [(x - min_val) / (max_val - min_val) for x in data]
 
 
+# Element-wise wrappers around the scalar helpers, for bit-exact batch paths.
+_exact_log = np.frompyfunc(math.log, 1, 1)
+_exact_sigmoid = np.frompyfunc(sigmoid, 1, 1)
+
+
 # ------------------------
 # Creditworthiness Assessment
 # ------------------------
@@ -117,6 +150,55 @@ class AlternativeDataFusion:
         score = self.trust_ripple(data)
         return sigmoid(score)
 
+    def feature_transform(self, matrix: Any) -> np.ndarray:
+        """
+        Applies the per-feature trust transform log(1 + |x|) * sigmoid(x) to a whole matrix.
+
+        Args:
+            matrix (Any): (N, input_size) array, nested list or buffer of input features.
+
+        Returns:
+            np.ndarray: Transformed (N, input_size) float64 matrix.
+        """
+        x = np.asarray(matrix, dtype=np.float64)
+        if x.ndim == 1:
+            x = x.reshape(-1, len(self.weights))
+        return np.log(1 + np.abs(x)) * sigmoid_array(x)
+
+    def predict_batch(self, matrix: Any, exact: bool = False) -> np.ndarray:
+        """
+        Predicts creditworthiness scores for many applicants in one vectorized pass.
+
+        Terms are formed as (w * log(1 + |x|)) * sigmoid(x) and accumulated column by
+        column, in the same order as `trust_ripple`. By default NumPy's exp/log are used,
+        which can differ from the `math` module by one ulp per score. With `exact`, the
+        element-wise log/exp go through the `math` functions, so every score is
+        bit-identical to `predict` (at a lower, but still loop-free per row, speed).
+
+        Args:
+            matrix (Any): (N, input_size) array, nested list or buffer of input features.
+            exact (bool, optional): Use the `math` module to match `predict` bit for bit.
+
+        Returns:
+            np.ndarray: Array of N normalized creditworthiness scores.
+        """
+        x = np.asarray(matrix, dtype=np.float64)
+        if x.ndim == 1:
+            x = x.reshape(-1, len(self.weights))
+        if exact:
+            log = _exact_log(1 + np.abs(x)).astype(np.float64)
+            squash = _exact_sigmoid(x).astype(np.float64)
+        else:
+            log = np.log(1 + np.abs(x))
+            squash = sigmoid_array(x)
+        score = np.zeros(x.shape[0])
+        for i, w in enumerate(self.weights[:x.shape[1]]):
+            score += w * log[:, i] * squash[:, i]
+        score = score + self.bias
+        if exact:
+            return _exact_sigmoid(score).astype(np.float64)
+        return sigmoid_array(score)
+
     def train(self, data_list: List[List[float]], targets: List[float], epochs: int = 50, lr: float = 0.01) -> None:
         """
         Trains the model using gradient descent.
@@ -136,17 +218,186 @@ class AlternativeDataFusion:
                     self.weights[i] -= lr * gradient
                 self.bias -= lr * error
 
+    def train_batch(self, data_list: Any, targets: Any, epochs: int = 50, lr: float = 0.01,
+                    batch_size: int = 256, validation_split: float = 0.0, patience: int = 5,
+                    seed: Optional[int] = None) -> None:
+        """
+        Trains the model with vectorized mini-batch gradient descent.
+
+        The feature transform is computed once for the whole dataset; every step is then a
+        pair of matrix products. When `validation_split` is set, the tail of a shuffled copy
+        of the data is held out and training stops after `patience` epochs without a drop in
+        validation error, restoring the best weights seen.
+
+        Args:
+            data_list (Any): (N, input_size) training data as an array or nested list.
+            targets (Any): N target scores.
+            epochs (int, optional): Maximum number of training epochs.
+            lr (float, optional): Learning rate.
+            batch_size (int, optional): Number of samples per gradient step.
+            validation_split (float, optional): Fraction of samples held out for early stopping.
+            patience (int, optional): Epochs without validation improvement before stopping.
+            seed (Optional[int]): Seed for shuffling.
+        """
+        rng = np.random.default_rng(seed)
+        features = self.feature_transform(data_list)
+        y = np.asarray(targets, dtype=np.float64)
+        order = rng.permutation(len(y))
+        n_val = int(len(y) * validation_split)
+        train_idx, val_idx = order[:len(y) - n_val], order[len(y) - n_val:]
+        x_train, y_train = features[train_idx], y[train_idx]
+        x_val, y_val = features[val_idx], y[val_idx]
+
+        w = np.asarray(self.weights, dtype=np.float64)
+        b = float(self.bias)
+        best_w, best_b, best_loss = w.copy(), b, math.inf
+        stale = 0
+        for _ in range(epochs):
+            perm = rng.permutation(len(y_train))
+            for start in range(0, len(perm), batch_size):
+                idx = perm[start:start + batch_size]
+                error = sigmoid_array(x_train[idx] @ w + b) - y_train[idx]
+                w -= lr * (x_train[idx].T @ error) / len(idx)
+                b -= lr * float(error.mean())
+            if n_val:
+                val_loss = float(np.mean((sigmoid_array(x_val @ w + b) - y_val) ** 2))
+                if val_loss < best_loss:
+                    best_w, best_b, best_loss = w.copy(), b, val_loss
+                    stale = 0
+                else:
+                    stale += 1
+                    if stale >= patience:
+                        break
+        if n_val:
+            w, b = best_w, best_b
+        self.weights = w.tolist()
+        self.bias = b
+
+
+class SparseAdjacency:
+    """
+    Compressed sparse row (CSR) adjacency matrix for social graphs.
+    Row i holds the weighted links that feed influence into node i, so
+    `matvec` costs O(edges) rather than O(nodes ** 2).
+    """
+    def __init__(self, n_nodes: int, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray) -> None:
+        self.n_nodes: int = n_nodes
+        self.indptr: np.ndarray = np.asarray(indptr, dtype=np.int64)
+        self.indices: np.ndarray = np.asarray(indices, dtype=np.int64)
+        self.data: np.ndarray = np.asarray(data, dtype=np.float64)
+        # Row index of every stored entry (the COO view), used by matvec.
+        self.rows: np.ndarray = np.repeat(np.arange(n_nodes), np.diff(self.indptr))
+
+    @classmethod
+    def from_edges(cls, edges: Any, n_nodes: Optional[int] = None) -> "SparseAdjacency":
+        """
+        Builds the matrix from an edge list of [src, dst, weight] triples.
+        An edge means `src` influences `dst`, i.e. connections[dst][src] = weight.
+
+        Args:
+            edges (Any): Edge list or (E, 3) array.
+            n_nodes (Optional[int]): Number of nodes; inferred from the edges if omitted.
+
+        Returns:
+            SparseAdjacency: The CSR adjacency matrix.
+
+        Raises:
+            ValueError: If an endpoint is not an integer node id in [0, n_nodes).
+        """
+        triples = np.asarray(edges, dtype=np.float64).reshape(-1, 3)
+        ends = triples[:, :2]
+        if len(triples) and (ends.min() < 0 or not np.array_equal(ends, np.floor(ends))):
+            raise ValueError("Edge endpoints must be non-negative integer node ids")
+        src = triples[:, 0].astype(np.int64)
+        dst = triples[:, 1].astype(np.int64)
+        if n_nodes is None:
+            n_nodes = int(max(src.max(), dst.max())) + 1 if len(triples) else 0
+        elif len(triples) and max(src.max(), dst.max()) >= n_nodes:
+            raise ValueError(f"Edge endpoint {int(max(src.max(), dst.max()))} is out of range for {n_nodes} nodes")
+        order = np.argsort(dst, kind='stable')
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=n_nodes), out=indptr[1:])
+        return cls(n_nodes, indptr, src[order], triples[order, 2])
+
+    @classmethod
+    def from_dense(cls, connections: List[List[float]]) -> "SparseAdjacency":
+        """
+        Builds the matrix from a dense connections[i][j] list-of-lists.
+
+        Args:
+            connections (List[List[float]]): Social connections matrix.
+
+        Returns:
+            SparseAdjacency: The CSR adjacency matrix.
+        """
+        dense = np.asarray(connections, dtype=np.float64)
+        dst, src = np.nonzero(dense)
+        edges = np.column_stack([src, dst, dense[dst, src]])
+        return cls.from_edges(edges, n_nodes=dense.shape[0])
+
+    @property
+    def nnz(self) -> int:
+        """Number of stored edges."""
+        return len(self.data)
+
+    def matvec(self, x: Any) -> np.ndarray:
+        """
+        Sparse matrix-vector product: sum_j connections[i][j] * x[j] for every node i.
+
+        Args:
+            x (Any): Node values.
+
+        Returns:
+            np.ndarray: Aggregated influence per node.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        return np.bincount(self.rows, weights=self.data * x[self.indices], minlength=self.n_nodes)
+
+    def matmat(self, x: Any) -> np.ndarray:
+        """
+        Sparse matrix-matrix product for (nodes, features) node states.
+
+        Args:
+            x (Any): (nodes, features) node states.
+
+        Returns:
+            np.ndarray: Aggregated (nodes, features) neighbourhood states.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        out = np.zeros((self.n_nodes, x.shape[1]))
+        filled = np.diff(self.indptr) > 0
+        if filled.any():
+            contrib = self.data[:, None] * x[self.indices]
+            out[filled] = np.add.reduceat(contrib, self.indptr[:-1][filled], axis=0)
+        return out
+
 
 class GraphNeuralNetwork:
     """
     "Social Influence Score" with propagation.
     Propagates influence across nodes based on social connections.
     """
-    def __init__(self, size: int = 5) -> None:
+    def __init__(self, size: int = 5, hops: int = 1, dim: int = 1) -> None:
         self.weights: List[List[float]] = [
             [random.uniform(-1, 1) for _ in range(size)] for _ in range(size)
         ]
         self.bias: List[float] = [random.uniform(-1, 1) for _ in range(size)]
+        # Per-layer (dim x dim) weight matrices and biases for k-hop propagation.
+        self.hops: int = hops
+        self.layer_weights: List[np.ndarray] = [
+            np.array([[random.uniform(-1, 1) for _ in range(dim)] for _ in range(dim)]) for _ in range(hops)
+        ]
+        self.layer_bias: List[np.ndarray] = [
+            np.array([random.uniform(-1, 1) for _ in range(dim)]) for _ in range(hops)
+        ]
+        # First-hop aggregates keyed by a caller-supplied graph handle (see `aggregate`).
+        self._aggregate_cache: Dict[Any, np.ndarray] = {}
+        # Live graph state for incremental scoring (see `attach` and `apply_delta`).
+        self.live_nodes: List[float] = []
+        self.live_in: List[Dict[int, float]] = []
+        self.live_out: List[Dict[int, float]] = []
+        self.live_influence: List[float] = []
+        self.live_scores: List[float] = []
 
     def propagate(self, nodes: List[float], connections: List[List[float]]) -> List[float]:
         """
@@ -159,25 +410,213 @@ class GraphNeuralNetwork:
         Returns:
             List[float]: Updated node values.
         """
+        # sum(w * influence for w in row) == influence * sum(row), so fold each row once.
+        gains = [sum(row) for row in self.weights]
         new_nodes = [0] * len(nodes)
         for i in range(len(nodes)):
             influence = sum(nodes[j] * connections[i][j] for j in range(len(nodes)))
-            new_nodes[i] = relu(sum(w * influence for w in self.weights[i]) + self.bias[i])
+            new_nodes[i] = relu(influence * gains[i] + self.bias[i])
         return new_nodes
 
-    def predict(self, nodes: List[float], connections: List[List[float]]) -> List[float]:
+    def node_parameters(self, n_nodes: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the (gain, bias) applied to each node of an `n_nodes` graph.
+
+        Graphs of up to `size` nodes use the per-node parameters, exactly as
+        `propagate` does. Larger graphs have no per-node parameters to draw on,
+        so every node shares one per-graph gain and bias: the means of the
+        per-node ones.
+
+        Args:
+            n_nodes (int): Number of nodes in the graph.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Per-node gains and biases.
+        """
+        gains = np.array([sum(row) for row in self.weights])
+        bias = np.asarray(self.bias, dtype=np.float64)
+        if n_nodes <= len(bias):
+            return gains[:n_nodes], bias[:n_nodes]
+        return np.full(n_nodes, gains.mean()), np.full(n_nodes, bias.mean())
+
+    def propagate_sparse(self, nodes: Any, adjacency: SparseAdjacency) -> np.ndarray:
+        """
+        Propagates influence with a sparse mat-vec, in O(nodes + edges).
+        Graphs larger than `size` use shared parameters (see `node_parameters`).
+
+        Args:
+            nodes (Any): Initial node values.
+            adjacency (SparseAdjacency): Sparse social connections matrix.
+
+        Returns:
+            np.ndarray: Updated node values.
+        """
+        influence = adjacency.matvec(nodes)
+        gains, bias = self.node_parameters(adjacency.n_nodes)
+        return np.maximum(0, influence * gains + bias)
+
+    def aggregate(self, adjacency: SparseAdjacency, states: np.ndarray, key: Optional[Any] = None) -> np.ndarray:
+        """
+        Returns the neighbourhood aggregate A @ states.
+        The first hop's aggregate does not depend on the layer weights, so a caller
+        scoring the same graph and node states repeatedly (or with several heads)
+        can pass a `key` naming that (graph, nodes) pair to compute it only once.
+        The caller owns the key and must use a new one when either input changes.
+
+        Args:
+            adjacency (SparseAdjacency): Sparse social connections matrix.
+            states (np.ndarray): (nodes, features) node states.
+            key (Optional[Any]): Hashable handle for the (adjacency, states) pair; no caching if omitted.
+
+        Returns:
+            np.ndarray: Aggregated (nodes, features) neighbourhood states.
+        """
+        if key is None:
+            return adjacency.matmat(states)
+        cached = self._aggregate_cache.get(key)
+        if cached is None:
+            cached = adjacency.matmat(states)
+            if len(self._aggregate_cache) >= 8:
+                self._aggregate_cache.pop(next(iter(self._aggregate_cache)))
+            self._aggregate_cache[key] = cached
+        return cached
+
+    def propagate_hops(self, nodes: Any, connections: Any, hops: Optional[int] = None,
+                       cache_key: Optional[Any] = None) -> np.ndarray:
+        """
+        Multi-layer (k-hop) propagation: H <- relu((A @ H) @ W_l + b_l) for each layer l.
+
+        Args:
+            nodes (Any): (nodes,) values or (nodes, dim) feature vectors.
+            connections (Any): Social connections matrix, dense or a SparseAdjacency.
+            hops (Optional[int]): Number of layers to apply (1..`self.hops`); defaults to all.
+            cache_key (Optional[Any]): Handle for reusing the first-hop aggregate (see `aggregate`).
+
+        Returns:
+            np.ndarray: Node states after the last layer, in the shape of `nodes`.
+        """
+        hops = self.hops if hops is None else hops
+        if not 1 <= hops <= self.hops:
+            raise ValueError(f"hops must be between 1 and {self.hops}, got {hops}")
+        if not isinstance(connections, SparseAdjacency):
+            connections = SparseAdjacency.from_dense(connections)
+        states = np.asarray(nodes, dtype=np.float64)
+        squeeze = states.ndim == 1
+        states = states.reshape(connections.n_nodes, -1)
+        if states.shape[1] != self.layer_weights[0].shape[0]:
+            raise ValueError(f"Expected node features of size {self.layer_weights[0].shape[0]}, got {states.shape[1]}")
+        for layer in range(hops):
+            aggregated = self.aggregate(connections, states, cache_key) if layer == 0 else connections.matmat(states)
+            states = np.maximum(0, aggregated @ self.layer_weights[layer] + self.layer_bias[layer])
+        return states[:, 0] if squeeze else states
+
+    def predict(self, nodes: List[float], connections: Any) -> List[float]:
         """
         Predicts updated node scores.
         
         Args:
             nodes (List[float]): Input node values.
-            connections (List[List[float]]): Social connections matrix.
+            connections (Any): Social connections matrix, dense or a SparseAdjacency.
             
         Returns:
             List[float]: Predicted node scores.
         """
+        if isinstance(connections, SparseAdjacency):
+            return self.propagate_sparse(nodes, connections).tolist()
         return self.propagate(nodes, connections)
 
+    def _node_score(self, i: int, params: Tuple[np.ndarray, np.ndarray]) -> float:
+        gains, bias = params
+        return relu(self.live_influence[i] * float(gains[i]) + float(bias[i]))
+
+    def _grow(self, n_nodes: int) -> None:
+        # New nodes start unscored; `apply_delta` scores them once the graph size is final.
+        while len(self.live_nodes) < n_nodes:
+            self.live_nodes.append(0.0)
+            self.live_in.append({})
+            self.live_out.append({})
+            self.live_influence.append(0.0)
+            self.live_scores.append(0.0)
+
+    def attach(self, nodes: List[float], connections: Any) -> List[float]:
+        """
+        Loads a graph for incremental scoring and computes every node score once.
+
+        Args:
+            nodes (List[float]): Initial node values.
+            connections (Any): Social connections matrix, dense or a SparseAdjacency.
+
+        Returns:
+            List[float]: Node scores, as `predict` would return them.
+        """
+        if not isinstance(connections, SparseAdjacency):
+            connections = SparseAdjacency.from_dense(connections)
+        self.live_nodes = [float(v) for v in nodes]
+        self.live_in = [{} for _ in nodes]
+        self.live_out = [{} for _ in nodes]
+        for dst, src, w in zip(connections.rows.tolist(), connections.indices.tolist(), connections.data.tolist()):
+            self.live_in[dst][src] = self.live_in[dst].get(src, 0.0) + w
+            self.live_out[src][dst] = self.live_in[dst][src]
+        self.live_influence = connections.matvec(self.live_nodes).tolist()
+        params = self.node_parameters(len(self.live_nodes))
+        self.live_scores = [self._node_score(i, params) for i in range(len(self.live_nodes))]
+        return list(self.live_scores)
+
+    def apply_delta(self, delta: Dict[str, Any]) -> Dict[int, float]:
+        """
+        Applies a graph change and rescores only the nodes whose influence changed,
+        so the cost depends on the degree of the touched nodes, not the graph size.
+
+        The delta may contain:
+            'edges': [[src, dst, weight], ...] edges to add or reweight.
+            'removed_edges': [[src, dst], ...] edges to drop.
+            'nodes': {node: value} changed node values (new ids grow the graph).
+
+        Args:
+            delta (Dict[str, Any]): Graph change.
+
+        Returns:
+            Dict[int, float]: New score for every affected node.
+        """
+        affected = set()
+        before = len(self.live_nodes)
+
+        def set_edge(src: int, dst: int, weight: float) -> None:
+            self._grow(max(src, dst) + 1)
+            old = self.live_in[dst].get(src, 0.0)
+            if weight:
+                self.live_in[dst][src] = weight
+                self.live_out[src][dst] = weight
+            else:
+                self.live_in[dst].pop(src, None)
+                self.live_out[src].pop(dst, None)
+            self.live_influence[dst] += (weight - old) * self.live_nodes[src]
+            affected.add(dst)
+
+        for src, dst, weight in delta.get('edges', []):
+            set_edge(int(src), int(dst), float(weight))
+        for src, dst in delta.get('removed_edges', []):
+            set_edge(int(src), int(dst), 0.0)
+        for node, value in delta.get('nodes', {}).items():
+            node = int(node)
+            self._grow(node + 1)
+            change = float(value) - self.live_nodes[node]
+            self.live_nodes[node] = float(value)
+            for dst, w in self.live_out[node].items():
+                self.live_influence[dst] += w * change
+                affected.add(dst)
+            affected.add(node)
+
+        after = len(self.live_nodes)
+        affected.update(range(before, after))
+        if before <= len(self.bias) < after:
+            # Crossing `size` switches every node to the shared parameters.
+            affected.update(range(before))
+        params = self.node_parameters(after)
+        for i in affected:
+            self.live_scores[i] = self._node_score(i, params)
+        return {i: self.live_scores[i] for i in affected}
+
     def train(self, nodes: List[float], connections: List[List[float]], targets: List[float], epochs: int = 50, lr: float = 0.01) -> None:
         """
         Trains the GNN using gradient descent.
@@ -198,34 +637,146 @@ class GraphNeuralNetwork:
                     self.weights[i][j] -= lr * error * nodes[j]
 
 
+def _train_local_model(weights: np.ndarray, bias: float, data: np.ndarray, targets: np.ndarray,
+                       epochs: int, lr: float, batch_size: int = 256) -> Tuple[np.ndarray, float, float]:
+    """
+    Trains one institution's model from the given parameters.
+    Module-level so it can run in a worker process; only arrays cross the process boundary.
+    `lr` is a per-sample rate: `train_batch` averages the gradient over each batch, so the
+    step is scaled by the batch size to move the weights about as far as per-sample SGD.
+
+    Args:
+        weights (np.ndarray): Starting weights.
+        bias (float): Starting bias.
+        data (np.ndarray): Local training data.
+        targets (np.ndarray): Local target scores.
+        epochs (int): Number of local training epochs.
+        lr (float): Per-sample learning rate.
+        batch_size (int, optional): Number of samples per gradient step.
+
+    Returns:
+        Tuple[np.ndarray, float, float]: Trained weights, bias and mean local prediction.
+    """
+    model = AlternativeDataFusion(input_size=len(weights))
+    model.weights = weights.tolist()
+    model.bias = bias
+    model.train_batch(data, targets, epochs=epochs, lr=lr * min(batch_size, len(targets)), batch_size=batch_size)
+    return np.asarray(model.weights), model.bias, float(model.predict_batch(data).mean())
+
+
+# Per-process copy of the institutions' data, installed once by `_init_local_worker`.
+_LOCAL_DATA: List[Tuple[np.ndarray, np.ndarray]] = []
+
+
+def _init_local_worker(data_sets: List[np.ndarray], target_sets: List[np.ndarray]) -> None:
+    """
+    Process-pool initializer: ships every institution's data to a worker once,
+    so each federated round only sends model parameters across the boundary.
+
+    Args:
+        data_sets (List[np.ndarray]): Local training data per institution.
+        target_sets (List[np.ndarray]): Local target scores per institution.
+    """
+    global _LOCAL_DATA
+    _LOCAL_DATA = list(zip(data_sets, target_sets))
+
+
+def _train_worker_model(index: int, weights: np.ndarray, bias: float,
+                        epochs: int, lr: float, batch_size: int) -> Tuple[np.ndarray, float, float]:
+    """
+    Trains institution `index` on the data installed by `_init_local_worker`.
+
+    Args:
+        index (int): Institution index.
+        weights (np.ndarray): Starting weights.
+        bias (float): Starting bias.
+        epochs (int): Number of local training epochs.
+        lr (float): Per-sample learning rate.
+        batch_size (int): Number of samples per gradient step.
+
+    Returns:
+        Tuple[np.ndarray, float, float]: Trained weights, bias and mean local prediction.
+    """
+    data, targets = _LOCAL_DATA[index]
+    return _train_local_model(weights, bias, data, targets, epochs, lr, batch_size)
+
+
 class FederatedCreditScoring:
     """
     "Consensus Trust" averaging.
     Trains local models and computes a global creditworthiness score.
+    The global model starts as the average of the institutions' initial models, so
+    applicants get a per-applicant score even before the first training round.
     """
     def __init__(self, num_institutions: int) -> None:
         self.models: List[AlternativeDataFusion] = [AlternativeDataFusion() for _ in range(num_institutions)]
         self.global_score: float = 0
+        self.global_weights: np.ndarray = np.mean([model.weights for model in self.models], axis=0)
+        self.global_bias: float = float(np.mean([model.bias for model in self.models]))
 
-    def train(self, local_data_sets: List[List[List[float]]], targets_list: List[List[float]], epochs: int = 50) -> None:
+    def train(self, local_data_sets: List[List[List[float]]], targets_list: List[List[float]], epochs: int = 50,
+              rounds: int = 1, lr: float = 0.01, max_workers: Optional[int] = None, parallel: bool = False,
+              weight_by_samples: bool = False, batch_size: int = 256) -> None:
         """
-        Trains local models and computes a global score.
+        Trains local models over one or more FedAvg-style rounds and computes a global score.
+        Every round starts all institutions from the same global model, then averages the
+        locally trained weights into the next global model.
         
         Args:
             local_data_sets (List[List[List[float]]]): List of training datasets for each institution.
             targets_list (List[List[float]]): List of target scores for each institution.
-            epochs (int, optional): Number of training epochs.
-        """
-        predictions: List[float] = []
-        for model, data, targets in zip(self.models, local_data_sets, targets_list):
-            model.train(data, targets, epochs)
-            pred = [model.predict(d) for d in data]
-            predictions.append(sum(pred) / len(pred))
-        self.global_score = sum(predictions) / len(predictions)
+            epochs (int, optional): Number of local training epochs per round.
+            rounds (int, optional): Number of federated averaging rounds.
+            lr (float, optional): Per-sample learning rate, scaled by the batch size for the
+                mean-gradient mini-batch steps of local training.
+            max_workers (Optional[int]): Worker processes for parallel mode; defaults to the CPU count.
+            parallel (bool, optional): Train institutions concurrently in a process pool.
+            weight_by_samples (bool, optional): Weight each institution's model by its sample count.
+            batch_size (int, optional): Number of samples per local gradient step.
+
+        Raises:
+            ValueError: If `rounds` is less than 1.
+        """
+        if rounds < 1:
+            raise ValueError(f"rounds must be at least 1, got {rounds}")
+        data_sets = [np.asarray(d, dtype=np.float64) for d in local_data_sets]
+        target_sets = [np.asarray(t, dtype=np.float64) for t in targets_list]
+        shares = [len(t) if weight_by_samples else 1 for t in target_sets]
+        executor = None
+        if parallel:
+            executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_local_worker,
+                                           initargs=(data_sets, target_sets))
+        try:
+            for _ in range(rounds):
+                for model in self.models:
+                    model.weights = self.global_weights.tolist()
+                    model.bias = self.global_bias
+                if executor is not None:
+                    indices = range(len(data_sets))
+                    results = list(executor.map(
+                        _train_worker_model, indices, itertools.repeat(self.global_weights),
+                        itertools.repeat(self.global_bias), itertools.repeat(epochs), itertools.repeat(lr),
+                        itertools.repeat(batch_size)
+                    ))
+                else:
+                    results = [
+                        _train_local_model(self.global_weights, self.global_bias, data, targets, epochs, lr, batch_size)
+                        for data, targets in zip(data_sets, target_sets)
+                    ]
+                self.global_weights = np.average([weights for weights, _, _ in results], axis=0, weights=shares)
+                self.global_bias = float(np.average([bias for _, bias, _ in results], weights=shares))
+            for model in self.models:
+                model.weights = self.global_weights.tolist()
+                model.bias = self.global_bias
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        predictions = [mean_prediction for _, _, mean_prediction in results]
+        self.global_score = float(np.average(predictions, weights=shares))
 
     def predict(self, data: List[float]) -> float:
         """
-        Returns the global consensus score.
+        Scores one applicant with the averaged global model.
         
         Args:
             data (List[float]): Input data.
@@ -233,7 +784,20 @@ class FederatedCreditScoring:
         Returns:
             float: Global credit score.
         """
-        return self.global_score
+        return float(self.predict_batch([data])[0])
+
+    def predict_batch(self, matrix: Any) -> np.ndarray:
+        """
+        Scores a batch of applicants with one dot product against the averaged weights.
+        
+        Args:
+            matrix (Any): (N, input_size) array or nested list of input features.
+            
+        Returns:
+            np.ndarray: Array of N global credit scores.
+        """
+        transformed = self.models[0].feature_transform(matrix)
+        return sigmoid_array(transformed @ self.global_weights + self.global_bias)
 
 
 class DynamicCreditScoring:
@@ -265,171 +829,1310 @@ class DynamicCreditScoring:
         return sigmoid(self.score)
 
 
-# ------------------------
-# Automating Compliance Tasks (KYC and AML)
-# ------------------------
-
-class DecentralizedKYC:
+class DynamicScoreStore:
     """
-    "Identity Echo" hash chain.
-    Verifies identity by hashing and storing user data.
+    Per-user "Time Decay Score" store.
+    Each user's score is a time-weighted average of the values it has received: an
+    event's weight halves every `half_life` seconds of wall-clock time, so the score
+    depends on when events happened, not on how many calls arrived. Each user keeps
+    only (weighted_sum, total_weight, last_timestamp) in flat NumPy arrays indexed
+    through a user id -> row dict, so lookups and updates are O(1), decay is applied
+    in closed form at the next update, and each user costs three float64 slots plus
+    the dict entry.
     """
-    def __init__(self) -> None:
-        self.chain: List[str] = []
+    def __init__(self, half_life: float = 30 * 24 * 3600.0, capacity: int = 1024) -> None:
+        self.half_life: float = half_life
+        self.index: Dict[Any, int] = {}
+        self.sums: np.ndarray = np.zeros(capacity)
+        self.weights: np.ndarray = np.zeros(capacity)
+        self.stamps: np.ndarray = np.zeros(capacity)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _row(self, user_id: Any) -> int:
+        row = self.index.get(user_id)
+        if row is None:
+            row = len(self.index)
+            if row == len(self.sums):
+                extra = max(len(self.sums), 1)
+                self.sums = np.concatenate([self.sums, np.zeros(extra)])
+                self.weights = np.concatenate([self.weights, np.zeros(extra)])
+                self.stamps = np.concatenate([self.stamps, np.zeros(extra)])
+            self.index[user_id] = row
+        return row
+
+    def decay(self, elapsed: float) -> float:
+        """
+        Returns the decay multiplier for a time span.
 
-    def hash(self, data: Any) -> str:
-        """
-        Generates SHA-256 hash of data.
-        
         Args:
-            data (Any): Data to be hashed.
-            
+            elapsed (float): Seconds since the last update.
+
         Returns:
-            str: SHA-256 hash.
+            float: Factor in (0, 1].
         """
-        return hashlib.sha256(str(data).encode()).hexdigest()
+        return 0.5 ** (max(elapsed, 0.0) / self.half_life)
 
-    def verify(self, user_data: Any) -> bool:
-        """
-        Verifies user data against the hash chain.
-        
-        Args:
-            user_data (Any): User data to verify.
-            
-        Returns:
-            bool: True if data is already in the chain, else appends and returns False.
+    def update(self, user_id: Any, value: float, timestamp: Optional[float] = None) -> float:
         """
-        data_hash = self.hash(user_data)
-        if data_hash in self.chain:
-            return True
-        self.chain.append(data_hash)
-        return False
+        Decays a user's accumulated weights to `timestamp` and adds a new value with weight 1.
 
+        Args:
+            user_id (Any): User identifier.
+            value (float): New score value to blend in.
+            timestamp (Optional[float]): Event time in seconds since the epoch; defaults to now.
 
-class DocumentVerifier:
-    """
-    "Pattern Confidence" scoring.
-    Checks document text against predefined patterns.
-    """
-    def __init__(self) -> None:
-        self.rules: Dict[str, str] = {'name': 'A-Z', 'date': '0-9-', 'id': 'A-Z0-9'}
+        Returns:
+            float: Normalized credit score after the update.
+        """
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            row = self._row(user_id)
+            if now >= self.stamps[row]:
+                d = self.decay(now - self.stamps[row])
+                self.sums[row] = d * self.sums[row] + value
+                self.weights[row] = d * self.weights[row] + 1.0
+                self.stamps[row] = now
+            else:
+                # A late event counts with the weight it would have had by the latest stamp.
+                d = self.decay(self.stamps[row] - now)
+                self.sums[row] += d * value
+                self.weights[row] += d
+            return sigmoid(self.sums[row] / self.weights[row])
+
+    def predict(self, user_id: Any) -> float:
+        """
+        Returns a user's normalized score (0.5 for unknown users).
+        The time-weighted average only changes when an event arrives, so no decay
+        needs to be applied at read time.
 
-    def check(self, text: str) -> bool:
-        """
-        Checks text against predefined patterns.
-        
         Args:
-            text (str): Document text.
-            
+            user_id (Any): User identifier.
+
         Returns:
-            bool: True if document passes the check, else False.
+            float: Normalized credit score.
         """
-        score = 0
-        for key, pattern in self.rules.items():
-            if any(c in pattern for c in text):
-                score += 1
-        return score / len(self.rules) > 0.5
-
-
-class AMLAnomalyDetector:
-    """
-    "Deviation Pulse" for anomaly detection.
-    Detects anomalies in transaction data.
-    """
-    def __init__(self, size: int = 5) -> None:
-        self.avg: List[float] = [0] * size
-        self.weights: List[float] = [random.uniform(-1, 1) for _ in range(size)]
+        row = self.index.get(user_id)
+        return sigmoid(0.0 if row is None else self.sums[row] / self.weights[row])
 
-    def pulse(self, data: List[float]) -> float:
+    def current_many(self, user_ids: Optional[List[Any]] = None) -> np.ndarray:
         """
-        Computes deviation from average.
-        
+        Vectorized `predict` for a portfolio report.
+
         Args:
-            data (List[float]): Transaction data.
-            
+            user_ids (Optional[List[Any]]): Users to evaluate; defaults to every stored user
+                in insertion order. Unknown users score 0.5.
+
         Returns:
-            float: Pulse value.
+            np.ndarray: Normalized credit scores.
         """
-        return sum(w * (d - a) for w, d, a in zip(self.weights, data, self.avg))
+        if user_ids is None:
+            rows = np.arange(len(self.index))
+        else:
+            rows = np.array([self.index.get(user_id, -1) for user_id in user_ids], dtype=np.int64)
+        known = rows >= 0
+        raw = np.zeros(len(rows))
+        raw[known] = self.sums[rows[known]] / self.weights[rows[known]]
+        return sigmoid_array(raw)
 
-    def train(self, data_list: List[List[float]]) -> None:
+    def save(self, path: str) -> None:
         """
-        Sets average based on training data.
-        
+        Snapshots the store to a NumPy .npz file.
+        Ids are stored as JSON lines so int and str ids keep their types.
+
         Args:
-            data_list (List[List[float]]): List of transaction data samples.
+            path (str): Output file path.
+
+        Raises:
+            TypeError: If a user id is not a str, int or float.
         """
-        self.avg = [
-            sum(d[i] for d in data_list) / len(data_list)
-            for i in range(len(data_list[0]))
-        ]
+        with self._lock:
+            n = len(self.index)
+            for user_id in self.index:
+                if not isinstance(user_id, (str, int, float)):
+                    raise TypeError(f"Cannot snapshot user id of type {type(user_id).__name__}")
+            ids = '\n'.join(json.dumps(user_id) for user_id in self.index)
+            np.savez(path, ids=np.array(ids), sums=self.sums[:n], weights=self.weights[:n],
+                     stamps=self.stamps[:n], params=np.array([self.half_life]))
 
-    def detect(self, data: List[float], threshold: float = 1.0) -> bool:
+    @classmethod
+    def load(cls, path: str) -> "DynamicScoreStore":
         """
-        Detects anomalies above a given threshold.
-        
+        Restores a store from a snapshot written by `save`.
+
         Args:
-            data (List[float]): Transaction data.
-            threshold (float, optional): Threshold value.
-            
+            path (str): Snapshot file path.
+
         Returns:
-            bool: True if anomaly detected, else False.
+            DynamicScoreStore: The restored store.
         """
-        return abs(self.pulse(data)) > threshold
+        with np.load(path) as snapshot:
+            n = len(snapshot['sums'])
+            store = cls(float(snapshot['params'][0]), capacity=max(n, 1))
+            store.sums[:n] = snapshot['sums']
+            store.weights[:n] = snapshot['weights']
+            store.stamps[:n] = snapshot['stamps']
+            lines = str(snapshot['ids']).split('\n') if n else []
+            store.index = {json.loads(line): row for row, line in enumerate(lines)}
+        return store
 
 
-class BiometricKYC:
+# ------------------------
+# Automating Compliance Tasks (KYC and AML)
+# ------------------------
+
+class BloomFilter:
     """
-    "Feature Drift" matcher.
-    Enrolls and verifies biometric data with drift threshold.
+    Bit-array Bloom filter over raw SHA-256 digests.
+    Bit positions come from double hashing two 8-byte slices of the digest, so no
+    extra hashing is needed and batches are checked with array operations.
     """
-    def __init__(self) -> None:
-        self.stored: Dict[Any, List[float]] = {}
+    def __init__(self, capacity: int = 1_000_000, fp_rate: float = 0.01) -> None:
+        self.capacity: int = capacity
+        self.fp_rate: float = fp_rate
+        self.n_bits: int = max(8, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.n_hashes: int = max(1, round(self.n_bits / capacity * math.log(2)))
+        self.bits: np.ndarray = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
 
-    def enroll(self, user_id: Any, bio_data: List[float]) -> None:
+    def _positions(self, digests: np.ndarray) -> np.ndarray:
+        h1 = np.ascontiguousarray(digests[:, :8]).view('<u8').ravel()
+        h2 = np.ascontiguousarray(digests[:, 8:16]).view('<u8').ravel() | np.uint64(1)
+        steps = np.arange(self.n_hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.n_bits)
+
+    def add_many(self, digests: np.ndarray) -> None:
         """
-        Stores biometric data for a user.
-        
+        Adds a batch of digests.
+
         Args:
-            user_id (Any): User identifier.
-            bio_data (List[float]): Biometric data.
+            digests (np.ndarray): (N, 32) uint8 array of raw digests.
         """
-        self.stored[user_id] = bio_data
+        positions = self._positions(digests).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
 
-    def verify(self, user_id: Any, bio_data: List[float]) -> bool:
+    def contains_many(self, digests: np.ndarray) -> np.ndarray:
         """
-        Verifies biometric data with drift threshold.
-        
+        Checks a batch of digests; False means definitely absent.
+
         Args:
-            user_id (Any): User identifier.
-            bio_data (List[float]): Biometric data to verify.
-            
+            digests (np.ndarray): (N, 32) uint8 array of raw digests.
+
         Returns:
-            bool: True if verification passes, else False.
+            np.ndarray: Boolean array, True where the digest may be present.
         """
-        if user_id not in self.stored:
-            return False
-        drift = sum(abs(a - b) for a, b in zip(self.stored[user_id], bio_data))
-        return drift < 0.1  # Threshold for match
+        positions = self._positions(digests)
+        hits = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return hits.all(axis=1)
 
 
-class ComplianceSmartContract:
+class DecentralizedKYC:
     """
-    "Rule Lock" system.
-    Enforces compliance rules through smart contract-like mechanisms.
+    "Identity Echo" hash chain.
+    Verifies identity by hashing and storing user data.
+
+    Digests are kept as raw 32-byte SHA-256 values. When `log_path` is given they are
+    appended to a log of 64-byte entries (digest, link), where each link is
+    sha256(previous link + digest), so the chain survives restarts. The log is
+    memory-mapped on load and indexed by a sorted array of 8-byte digest prefixes
+    (16 bytes of RAM per entry); entries added since the last merge sit in a small set.
+    A Bloom filter answers "definitely new" before the exact store is touched. It is
+    sized for at least `bloom_capacity` digests at `fp_rate` and for twice the chain
+    length on load, and is rebuilt at twice the size whenever the chain outgrows it. Lookups and appends hold a lock, so concurrent
+    request threads keep the chain in order.
     """
-    def __init__(self) -> None:
-        self.rules: Dict[str, Dict[str, Any]] = {}
+    ENTRY_SIZE = 64
+
+    def __init__(self, log_path: Optional[str] = None, merge_threshold: int = 65536,
+                 bloom_capacity: int = 1_000_000, fp_rate: float = 0.01) -> None:
+        self.log_path: Optional[str] = log_path
+        self.merge_threshold: int = merge_threshold
+        self.bloom_capacity: int = bloom_capacity
+        self.head: bytes = bytes(32)
+        self.recent: set = set()
+        self._entries: np.ndarray = np.zeros((0, self.ENTRY_SIZE), dtype=np.uint8)
+        self._prefixes: np.ndarray = np.zeros(0, dtype='>u8')
+        self._rows: np.ndarray = np.zeros(0, dtype=np.int64)
+        self._log = None
+        # Re-entrant: verify() holds it across contains() and append(), which may merge.
+        self._lock = threading.RLock()
+        self.bloom: BloomFilter = BloomFilter(bloom_capacity, fp_rate)
+        if log_path is not None:
+            self._load()
+            self._rebuild_bloom()
+            self._log = open(log_path, 'ab')
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self.recent)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.log_path):
+            return
+        size = os.path.getsize(self.log_path)
+        n_entries = size // self.ENTRY_SIZE
+        if size != n_entries * self.ENTRY_SIZE:
+            # A crash mid-append left a torn trailing entry; drop it so the log stays aligned.
+            os.truncate(self.log_path, n_entries * self.ENTRY_SIZE)
+        if n_entries == 0:
+            return
+        self._entries = np.memmap(self.log_path, dtype=np.uint8, mode='r', shape=(n_entries, self.ENTRY_SIZE))
+        self.head = self._entries[-1, 32:].tobytes()
+        prefixes = np.ascontiguousarray(self._entries[:, :8]).view('>u8').ravel()
+        self._rows = np.argsort(prefixes, kind='stable')
+        self._prefixes = prefixes[self._rows]
+
+    def _rebuild_bloom(self) -> None:
+        """Rebuilds the Bloom filter with room for twice the current chain length."""
+        bloom = BloomFilter(max(self.bloom_capacity, 2 * len(self)), self.bloom.fp_rate)
+        for start in range(0, len(self._entries), 1 << 20):
+            bloom.add_many(self._entries[start:start + (1 << 20), :32])
+        if self.recent:
+            bloom.add_many(np.frombuffer(b''.join(self.recent), dtype=np.uint8).reshape(-1, 32))
+        self.bloom = bloom
+
+    def _merge(self) -> None:
+        """Folds recently appended digests into the memory-mapped index."""
+        self._log.flush()
+        self._load()
+        self.recent.clear()
 
-    def set_rule(self, contract_id: str, conditions: Dict[str, Any]) -> None:
+    def hash(self, data: Any) -> str:
         """
-        Sets compliance rules for a contract.
+        Generates SHA-256 hash of data.
         
         Args:
-            contract_id (str): Contract identifier.
-            conditions (Dict[str, Any]): Conditions for the contract.
+            data (Any): Data to be hashed.
+            
+        Returns:
+            str: SHA-256 hash.
         """
+        return hashlib.sha256(str(data).encode()).hexdigest()
+
+    def digest(self, data: Any) -> bytes:
+        """
+        Generates the raw 32-byte SHA-256 digest of data.
+
+        Args:
+            data (Any): Data to be hashed.
+
+        Returns:
+            bytes: SHA-256 digest.
+        """
+        return hashlib.sha256(str(data).encode()).digest()
+
+    def contains(self, data_digest: bytes) -> bool:
+        """
+        Checks whether a digest is already in the chain.
+
+        Args:
+            data_digest (bytes): Raw SHA-256 digest.
+
+        Returns:
+            bool: True if the digest is stored.
+        """
+        with self._lock:
+            if data_digest in self.recent:
+                return True
+            if not self.bloom.contains_many(np.frombuffer(data_digest, dtype=np.uint8).reshape(1, 32))[0]:
+                return False
+            key = np.frombuffer(data_digest[:8], dtype='>u8')[0]
+            lo = np.searchsorted(self._prefixes, key, side='left')
+            hi = np.searchsorted(self._prefixes, key, side='right')
+            return any(self._entries[row, :32].tobytes() == data_digest for row in self._rows[lo:hi])
+
+    def append(self, data_digest: bytes) -> None:
+        """
+        Appends a digest to the chain, linking it to the previous entry.
+
+        Args:
+            data_digest (bytes): Raw SHA-256 digest.
+        """
+        with self._lock:
+            self.head = hashlib.sha256(self.head + data_digest).digest()
+            self.recent.add(data_digest)
+            self.bloom.add_many(np.frombuffer(data_digest, dtype=np.uint8).reshape(1, 32))
+            if self._log is not None:
+                self._log.write(data_digest + self.head)
+                self._log.flush()
+                if len(self.recent) >= self.merge_threshold:
+                    self._merge()
+            if len(self) > self.bloom.capacity:
+                self._rebuild_bloom()
+
+    def verify_chain(self) -> bool:
+        """
+        Recomputes every link of the persisted log.
+
+        Returns:
+            bool: True if every entry links correctly to its predecessor.
+        """
+        with self._lock:
+            if self._log is not None:
+                self._merge()
+            entries = self._entries
+        link = bytes(32)
+        for entry in entries:
+            raw = entry.tobytes()
+            link = hashlib.sha256(link + raw[:32]).digest()
+            if link != raw[32:]:
+                return False
+        return True
+
+    def verify(self, user_data: Any) -> bool:
+        """
+        Verifies user data against the hash chain.
+        
+        Args:
+            user_data (Any): User data to verify.
+            
+        Returns:
+            bool: True if data is already in the chain, else appends and returns False.
+        """
+        data_digest = self.digest(user_data)
+        with self._lock:
+            if self.contains(data_digest):
+                return True
+            self.append(data_digest)
+            return False
+
+    def verify_many(self, records: List[Any]) -> List[bool]:
+        """
+        Verifies a batch of user records, in order, as repeated `verify` calls would.
+        All records are hashed up front and checked against the Bloom filter in one
+        pass; only possible matches reach the exact store.
+
+        Args:
+            records (List[Any]): User data records to verify.
+
+        Returns:
+            List[bool]: Per-record verdicts; True if the record was already in the chain.
+        """
+        digests = [self.digest(record) for record in records]
+        if not digests:
+            return []
+        verdicts: List[bool] = []
+        added = set()
+        with self._lock:
+            maybe = self.bloom.contains_many(np.frombuffer(b''.join(digests), dtype=np.uint8).reshape(-1, 32))
+            for data_digest, possible in zip(digests, maybe.tolist()):
+                known = data_digest in added or (possible and self.contains(data_digest))
+                if not known:
+                    self.append(data_digest)
+                    added.add(data_digest)
+                verdicts.append(known)
+        return verdicts
+
+
+def compile_char_class(spec: str) -> str:
+    """
+    Turns a rule spec such as 'A-Z0-9' into a regex character-class body.
+    'x-y' is a range; every other character (including a leading or trailing '-') is literal.
+
+    Args:
+        spec (str): Character-class spec.
+
+    Returns:
+        str: Escaped regex character-class body.
+    """
+    parts: List[str] = []
+    i = 0
+    while i < len(spec):
+        if i + 2 < len(spec) and spec[i + 1] == '-':
+            parts.append(f"{re.escape(spec[i])}-{re.escape(spec[i + 2])}")
+            i += 3
+        else:
+            parts.append(re.escape(spec[i]))
+            i += 1
+    return ''.join(parts)
+
+
+class DocumentVerifier:
+    """
+    "Pattern Confidence" scoring.
+    Checks document text against predefined patterns.
+
+    Each rule is a character-class spec ('A-Z' is a range). Rules are compiled once;
+    `check` then walks the text a single time, searching for the union of the rules
+    not yet satisfied and stopping as soon as the verdict is decided.
+    """
+    def __init__(self, rules: Optional[Dict[str, str]] = None) -> None:
+        self.rules: Dict[str, str] = rules if rules is not None else {'name': 'A-Z', 'date': '0-9-', 'id': 'A-Z0-9'}
+        self._classes: List[str] = [compile_char_class(spec) for spec in self.rules.values()]
+        self._rule_patterns: List[re.Pattern] = [re.compile(f"[{body}]") for body in self._classes]
+        self._union_cache: Dict[int, re.Pattern] = {}
+        self.all_rules: int = (1 << len(self.rules)) - 1
+
+    @classmethod
+    def from_file(cls, path: str) -> "DocumentVerifier":
+        """
+        Loads a user-defined rule set from a JSON file mapping rule name to spec.
+
+        Args:
+            path (str): Path to the JSON rule file.
+
+        Returns:
+            DocumentVerifier: Verifier with the compiled rules.
+
+        Raises:
+            ValueError: If the file is not a non-empty object of string specs.
+        """
+        with open(path) as f:
+            rules = json.load(f)
+        if not isinstance(rules, dict) or not rules or \
+                not all(isinstance(name, str) and isinstance(spec, str) and spec for name, spec in rules.items()):
+            raise ValueError(f"{path} must map rule names to non-empty character-class specs")
+        return cls(rules)
+
+    def _union(self, pending: int) -> re.Pattern:
+        pattern = self._union_cache.get(pending)
+        if pattern is None:
+            body = ''.join(c for i, c in enumerate(self._classes) if pending >> i & 1)
+            pattern = self._union_cache[pending] = re.compile(f"[{body}]")
+        return pattern
+
+    def decided(self, matched: int) -> bool:
+        """
+        Returns True once enough rules have matched for the document to pass.
+
+        Args:
+            matched (int): Bitmask of matched rules.
+
+        Returns:
+            bool: Whether the verdict is already decided.
+        """
+        return bin(matched).count('1') / len(self.rules) > 0.5
+
+    def scan(self, text: str, matched: int = 0) -> int:
+        """
+        Scans text once, adding every rule it satisfies to the `matched` bitmask.
+
+        Args:
+            text (str): Document text.
+            matched (int, optional): Bitmask of rules already matched.
+
+        Returns:
+            int: Updated bitmask of matched rules.
+        """
+        pos = 0
+        while matched != self.all_rules and not self.decided(matched):
+            hit = self._union(self.all_rules & ~matched).search(text, pos)
+            if hit is None:
+                break
+            char = hit.group()
+            for i, pattern in enumerate(self._rule_patterns):
+                if pattern.match(char):
+                    matched |= 1 << i
+            pos = hit.end()
+        return matched
+
+    def check(self, text: str) -> bool:
+        """
+        Checks text against predefined patterns.
+        
+        Args:
+            text (str): Document text.
+            
+        Returns:
+            bool: True if document passes the check, else False.
+        """
+        return self.decided(self.scan(text))
+
+    def check_stream(self, chunks: Iterable[str]) -> bool:
+        """
+        Checks a document delivered in chunks, keeping only the matched-rule bitmask
+        between chunks and stopping as soon as the verdict is decided.
+
+        Args:
+            chunks (Iterable[str]): Document text chunks.
+
+        Returns:
+            bool: True if document passes the check, else False.
+        """
+        matched = 0
+        for chunk in chunks:
+            matched = self.scan(chunk, matched)
+            if self.decided(matched):
+                return True
+        return False
+
+    def check_file(self, path: str, chunk_size: int = 65536, encoding: str = 'utf-8') -> bool:
+        """
+        Checks a text file in fixed-size chunks, with flat memory use.
+
+        Args:
+            path (str): Path to the document text file.
+            chunk_size (int, optional): Characters read per chunk.
+            encoding (str, optional): File encoding.
+
+        Returns:
+            bool: True if document passes the check, else False.
+        """
+        with open(path, encoding=encoding, errors='replace') as f:
+            return self.check_stream(iter(lambda: f.read(chunk_size), ''))
+
+
+def iter_text_chunks(stream: Any, chunk_size: int = 65536, encoding: str = 'utf-8') -> Iterator[str]:
+    """
+    Decodes a binary stream (file or request body) into text chunks.
+    Multi-byte characters split across chunk boundaries are decoded correctly.
+
+    Args:
+        stream (Any): Binary stream with a `read` method.
+        chunk_size (int, optional): Bytes read per chunk.
+        encoding (str, optional): Text encoding.
+
+    Yields:
+        str: Decoded text chunks.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for block in iter(lambda: stream.read(chunk_size), b''):
+        yield decoder.decode(block)
+    yield decoder.decode(b'', final=True)
+
+
+class SegmentBaselines:
+    """
+    Per-segment transaction baselines (region, product or lifestyle group).
+    Means and variances live in one (segments x features) array keyed by a
+    segment id -> row dict; the hottest segments are also kept as ready-made
+    lists in a small LRU cache so `detect` does no array conversion.
+    """
+    def __init__(self, size: int, capacity: int = 64, cache_size: int = 1024) -> None:
+        self.size: int = size
+        self.index: Dict[Any, int] = {}
+        self.means: np.ndarray = np.zeros((capacity, size))
+        self.m2: np.ndarray = np.zeros((capacity, size))
+        self.counts: np.ndarray = np.zeros(capacity, dtype=np.int64)
+        self.cache_size: int = cache_size
+        self._cache: "OrderedDict[Any, List[float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def _row(self, segment: Any) -> int:
+        row = self.index.get(segment)
+        if row is None:
+            row = len(self.index)
+            if row == len(self.counts):
+                self.means = np.vstack([self.means, np.zeros_like(self.means)])
+                self.m2 = np.vstack([self.m2, np.zeros_like(self.m2)])
+                self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+            self.index[segment] = row
+        return row
+
+    def fit(self, data_list: Any, segments: List[Any]) -> None:
+        """
+        Sets every segment's baseline from labelled training data in one vectorized pass.
+
+        Args:
+            data_list (Any): (N, size) transaction data.
+            segments (List[Any]): Segment id of each transaction.
+        """
+        data = np.asarray(data_list, dtype=np.float64)
+        # Group with a dict so ids keep their Python identity (np.unique would coerce 1 and '1' together).
+        groups: Dict[Any, int] = {}
+        inverse = np.array([groups.setdefault(segment, len(groups)) for segment in segments], dtype=np.int64)
+        labels = list(groups)
+        rows = np.array([self._row(label) for label in labels], dtype=np.int64)
+        counts = np.bincount(inverse, minlength=len(labels))
+        sums = np.zeros((len(labels), self.size))
+        np.add.at(sums, inverse, data)
+        means = sums / counts[:, None]
+        m2 = np.zeros((len(labels), self.size))
+        np.add.at(m2, inverse, (data - means[inverse]) ** 2)
+        self.means[rows], self.m2[rows], self.counts[rows] = means, m2, counts
+        self._cache.clear()
+
+    def observe(self, segment: Any, data: List[float]) -> None:
+        """
+        Folds one transaction into its segment's running mean and variance (Welford).
+
+        Args:
+            segment (Any): Segment id.
+            data (List[float]): Transaction data.
+        """
+        row = self._row(segment)
+        x = np.asarray(data, dtype=np.float64)
+        self.counts[row] += 1
+        delta = x - self.means[row]
+        self.means[row] += delta / self.counts[row]
+        self.m2[row] += delta * (x - self.means[row])
+        self._cache.pop(segment, None)
+
+    def baseline(self, segment: Any) -> Optional[List[float]]:
+        """
+        Returns a segment's mean vector, or None for unknown segments.
+
+        Args:
+            segment (Any): Segment id.
+
+        Returns:
+            Optional[List[float]]: Baseline mean per feature.
+        """
+        cached = self._cache.get(segment)
+        if cached is not None:
+            self._cache.move_to_end(segment)
+            return cached
+        row = self.index.get(segment)
+        if row is None:
+            return None
+        baseline = self.means[row].tolist()
+        self._cache[segment] = baseline
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return baseline
+
+
+class AMLAnomalyDetector:
+    """
+    "Deviation Pulse" for anomaly detection.
+    Detects anomalies in transaction data.
+
+    In online mode every transaction passed to `detect` also updates the running
+    per-feature mean and variance (Welford's algorithm, or an exponentially weighted
+    version when `decay` is set), so the baseline tracks a live feed without retraining.
+    Transactions tagged with a segment are compared against that segment's baseline
+    (falling back to the global one for unseen segments).
+    """
+    def __init__(self, size: int = 5, online: bool = False, decay: Optional[float] = None) -> None:
+        self.avg: List[float] = [0] * size
+        self.weights: List[float] = [random.uniform(-1, 1) for _ in range(size)]
+        self.online: bool = online
+        self.decay: Optional[float] = decay  # Weight of the newest sample in EW mode.
+        self.count: int = 0
+        self.m2: List[float] = [0.0] * size  # Sum of squared deviations (EW mode: variance).
+        self.segments: SegmentBaselines = SegmentBaselines(size)
+
+    def pulse(self, data: List[float], segment: Optional[Any] = None) -> float:
+        """
+        Computes deviation from average.
+        
+        Args:
+            data (List[float]): Transaction data.
+            segment (Optional[Any]): Segment id whose baseline to compare against.
+            
+        Returns:
+            float: Pulse value.
+        """
+        avg = self.avg if segment is None else (self.segments.baseline(segment) or self.avg)
+        return sum(w * (d - a) for w, d, a in zip(self.weights, data, avg))
+
+    def train(self, data_list: List[List[float]], segments: Optional[List[Any]] = None) -> None:
+        """
+        Sets average based on training data.
+        
+        Args:
+            data_list (List[List[float]]): List of transaction data samples.
+            segments (Optional[List[Any]]): Segment id of each sample, to also fit per-segment baselines.
+        """
+        data = np.asarray(data_list, dtype=np.float64)
+        if segments is not None:
+            self.segments.fit(data, segments)
+        self.avg = data.mean(axis=0).tolist()
+        self.count = len(data)
+        if self.decay is None:
+            self.m2 = ((data - data.mean(axis=0)) ** 2).sum(axis=0).tolist()
+        else:
+            self.m2 = data.var(axis=0).tolist()
+
+    def observe(self, data: List[float]) -> None:
+        """
+        Folds one transaction into the running mean and variance.
+
+        Args:
+            data (List[float]): Transaction data.
+        """
+        self.count += 1
+        for i, x in enumerate(data):
+            delta = x - self.avg[i]
+            if self.decay is None:
+                self.avg[i] += delta / self.count
+                self.m2[i] += delta * (x - self.avg[i])
+            elif self.count == 1:
+                self.avg[i] = x
+            else:
+                self.avg[i] += self.decay * delta
+                self.m2[i] = (1 - self.decay) * (self.m2[i] + self.decay * delta * delta)
+
+    @property
+    def variance(self) -> List[float]:
+        """
+        Per-feature variance of the observed transactions.
+
+        Returns:
+            List[float]: Variance per feature.
+        """
+        if self.decay is not None:
+            return list(self.m2)
+        return [m / self.count if self.count else 0.0 for m in self.m2]
+
+    def detect(self, data: List[float], threshold: float = 1.0, segment: Optional[Any] = None) -> bool:
+        """
+        Detects anomalies above a given threshold.
+        In online mode the transaction then updates the baseline(s).
+        
+        Args:
+            data (List[float]): Transaction data.
+            threshold (float, optional): Threshold value.
+            segment (Optional[Any]): Segment id (region, product or lifestyle group).
+            
+        Returns:
+            bool: True if anomaly detected, else False.
+        """
+        anomaly = abs(self.pulse(data, segment)) > threshold
+        if self.online:
+            self.observe(data)
+            if segment is not None:
+                self.segments.observe(segment, data)
+        return anomaly
+
+    def pulse_batch(self, matrix: Any) -> np.ndarray:
+        """
+        Computes the Deviation Pulse for many transactions at once.
+
+        Args:
+            matrix (Any): (N, size) array of transaction data.
+
+        Returns:
+            np.ndarray: Pulse value per transaction.
+        """
+        return (np.asarray(matrix, dtype=np.float64) - np.asarray(self.avg)) @ np.asarray(self.weights)
+
+    def screen_file(self, path: str, output_path: str, threshold: float = 1.0, chunk_rows: int = 1_000_000,
+                    max_workers: Optional[int] = None) -> Dict[str, float]:
+        """
+        Rescreens a whole transaction file and writes only the flagged rows.
+
+        `.npy` files are memory-mapped and each worker maps its own block of rows;
+        other files are read as CSV (one transaction per line) in chunks. Flagged rows are
+        written to `output_path` as CSV: row index, transaction features, pulse score.
+
+        Args:
+            path (str): Transaction file (.npy of shape (N, size), or CSV).
+            output_path (str): CSV file to write flagged rows to.
+            threshold (float, optional): Threshold value.
+            chunk_rows (int, optional): Rows per vectorized block.
+            max_workers (Optional[int]): Worker processes; defaults to the CPU count.
+
+        Returns:
+            Dict[str, float]: Rows screened, rows flagged, elapsed seconds and rows per second.
+        """
+        started = time.perf_counter()
+        weights, avg = np.asarray(self.weights), np.asarray(self.avg)
+        rows = flagged = 0
+        if path.endswith('.npy'):
+            total = len(np.load(path, mmap_mode='r'))
+            worker = _screen_npy_block
+            blocks: Iterable[Any] = ((path, start, min(start + chunk_rows, total)) for start in range(0, total, chunk_rows))
+        else:
+            worker = _screen_block
+            blocks = _iter_csv_blocks(path, chunk_rows)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor, open(output_path, 'w') as out:
+            window = 2 * (max_workers or os.cpu_count() or 1)
+            results = _bounded_map(executor, worker, blocks, window, weights, avg, threshold)
+            for n_rows, offset, hit_rows, hit_data, hit_scores in results:
+                for index, features, score in zip((hit_rows + offset).tolist(), hit_data.tolist(), hit_scores.tolist()):
+                    out.write(','.join(map(str, [index, *features, score])) + '\n')
+                rows += n_rows
+                flagged += len(hit_rows)
+        elapsed = time.perf_counter() - started
+        return {'rows': rows, 'flagged': flagged, 'seconds': elapsed,
+                'rows_per_second': rows / elapsed if elapsed else float('inf')}
+
+
+def _screen_block(block: Tuple[int, np.ndarray], weights: np.ndarray, avg: np.ndarray,
+                  threshold: float) -> Tuple[int, int, np.ndarray, np.ndarray, np.ndarray]:
+    """Scores one block of transactions; returns only the rows above the threshold."""
+    offset, data = block
+    scores = (data - avg) @ weights
+    hits = np.nonzero(np.abs(scores) > threshold)[0]
+    return len(data), offset, hits, data[hits], scores[hits]
+
+
+def _screen_npy_block(block: Tuple[str, int, int], weights: np.ndarray, avg: np.ndarray,
+                      threshold: float) -> Tuple[int, int, np.ndarray, np.ndarray, np.ndarray]:
+    """Memory-maps one block of rows of a .npy file in the worker and scores it."""
+    path, start, stop = block
+    data = np.asarray(np.load(path, mmap_mode='r')[start:stop], dtype=np.float64)
+    return _screen_block((start, data), weights, avg, threshold)
+
+
+def _iter_csv_blocks(path: str, chunk_rows: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Reads a CSV transaction file in blocks of `chunk_rows` rows."""
+    offset = 0
+    with open(path) as f:
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            data = np.loadtxt(lines, delimiter=',', ndmin=2)
+            yield offset, data
+            offset += len(data)
+
+
+def _bounded_map(executor: ProcessPoolExecutor, fn: Any, items: Iterable[Any], window: int,
+                 *shared: Any) -> Iterator[Any]:
+    """
+    Like `executor.map`, but keeps at most `window` blocks in flight so a large
+    input is never read into memory all at once. Results come back in order.
+    """
+    pending: deque = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item, *shared))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class TemplateStore:
+    """
+    Compact biometric template store.
+    Templates are rows of a float32 (or float16) matrix with an id -> row dict.
+    With a `path`, rows are appended to `<path>.bin` and ids to `<path>.ids`
+    (one JSON value per line); a cold start memory-maps the matrix instead of
+    parsing it, so worker processes share one copy through the page cache.
+    Re-enrolling appends a new row and points the id at it. Intended for a single
+    writer process; appends from its threads are serialized by a lock. Each append writes the row before its id, so after a crash the
+    two files are trimmed back to the rows that have both on the next load.
+    """
+    def __init__(self, dim: Optional[int] = None, path: Optional[str] = None, dtype: str = 'float32') -> None:
+        self.path: Optional[str] = path
+        self.dtype: np.dtype = np.dtype(dtype)
+        self.dim: Optional[int] = dim
+        self.ids: List[Any] = []
+        self.rows: Dict[Any, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._length: int = 0
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(f"{path}.meta"):
+            with open(f"{path}.meta") as f:
+                meta = json.load(f)
+            self.dim, self.dtype = meta['dim'], np.dtype(meta['dtype'])
+            self._load()
+
+    def _load(self) -> None:
+        row_bytes = self.dim * self.dtype.itemsize
+        bin_size = os.path.getsize(f"{self.path}.bin") if os.path.exists(f"{self.path}.bin") else 0
+        n_rows = bin_size // row_bytes
+        ids_bytes = b''
+        if os.path.exists(f"{self.path}.ids"):
+            with open(f"{self.path}.ids", 'rb') as f:
+                ids_bytes = f.read()
+        # Only newline-terminated id lines are complete.
+        lines = ids_bytes.split(b'\n')[:-1]
+        n = min(n_rows, len(lines))
+        kept = sum(len(line) + 1 for line in lines[:n])
+        if kept != len(ids_bytes):
+            os.truncate(f"{self.path}.ids", kept)
+        if bin_size != n * row_bytes:
+            os.truncate(f"{self.path}.bin", n * row_bytes)
+        for row, line in enumerate(lines[:n]):
+            self.ids.append(json.loads(line))
+            self.rows[self.ids[-1]] = row
+        self._length = n
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, user_id: Any) -> bool:
+        return user_id in self.rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """(rows, dim) view of every stored template, including superseded rows."""
+        if self._matrix is None or len(self._matrix) < self._length:
+            if self.path is None or self._length == 0:
+                return np.zeros((0, self.dim or 0), dtype=self.dtype)
+            self._matrix = np.memmap(f"{self.path}.bin", dtype=self.dtype, mode='r', shape=(self._length, self.dim))
+        return self._matrix[:self._length]
+
+    def append(self, user_id: Any, bio_data: List[float]) -> int:
+        """
+        Appends a template and makes it the current one for `user_id`.
+
+        Args:
+            user_id (Any): User identifier.
+            bio_data (List[float]): Biometric data.
+
+        Returns:
+            int: Row of the new template.
+
+        Raises:
+            ValueError: If the template is not a flat vector of length `dim`.
+            TypeError: If the store is persisted and `user_id` is not a str, int or float,
+                which would not load back from JSON as the same dict key.
+        """
+        if self.path is not None and not isinstance(user_id, (str, int, float)):
+            raise TypeError(f"Cannot persist user id of type {type(user_id).__name__}")
+        template = np.asarray(bio_data, dtype=self.dtype)
+        if template.ndim != 1 or len(template) == 0:
+            raise ValueError("Biometric template must be a non-empty flat list of numbers")
+        if self.dim is not None and len(template) != self.dim:
+            raise ValueError(f"Expected a biometric template of length {self.dim}, got {len(template)}")
+        with self._lock:
+            return self._append(user_id, template)
+
+    def _append(self, user_id: Any, template: np.ndarray) -> int:
+        if self.dim is None:
+            self.dim = len(template)
+        row = self._length
+        if self.path is None:
+            if self._matrix is None or row == len(self._matrix):
+                grown = np.zeros((max(2 * row, 1024), self.dim), dtype=self.dtype)
+                if self._matrix is not None:
+                    grown[:row] = self._matrix
+                self._matrix = grown
+            self._matrix[row] = template
+        else:
+            if not os.path.exists(f"{self.path}.meta"):
+                with open(f"{self.path}.meta", 'w') as f:
+                    json.dump({'dim': self.dim, 'dtype': self.dtype.name}, f)
+            with open(f"{self.path}.bin", 'ab') as f:
+                f.write(template.tobytes())
+            with open(f"{self.path}.ids", 'a') as f:
+                f.write(json.dumps(user_id) + '\n')
+        self.ids.append(user_id)
+        self.rows[user_id] = row
+        self._length += 1
+        return row
+
+    def get(self, user_id: Any) -> Optional[np.ndarray]:
+        """
+        Returns a user's current template.
+
+        Args:
+            user_id (Any): User identifier.
+
+        Returns:
+            Optional[np.ndarray]: Template, or None if not enrolled.
+        """
+        row = self.rows.get(user_id)
+        return None if row is None else self.matrix[row]
+
+
+class TemplateIndex:
+    """
+    Grid-bucket index for 1:N biometric search under an L1 drift threshold.
+    Templates are projected onto their leading principal (unit) directions and
+    bucketed on a grid of side `threshold` in that projected space. Since
+    |u.(x - y)| <= ||x - y||_2 <= ||x - y||_1 for a unit vector u, any template within
+    drift `threshold` lies in a neighbouring cell on every axis, so a query only scans
+    the 3 ** dims surrounding buckets and the result is exact. The number of axes is
+    chosen from the data to balance bucket lookups against candidates scanned, and the
+    directions are re-fitted whenever the indexed set doubles.
+    """
+    def __init__(self, threshold: float = 0.1, max_dims: int = 8, sample_size: int = 4096) -> None:
+        self.threshold: float = threshold
+        self.max_dims: int = max_dims
+        self.sample_size: int = sample_size
+        self.directions: np.ndarray = np.zeros((0, 0))
+        self.buckets: Dict[Tuple[int, ...], List[int]] = {}
+        self.cells: Dict[int, Tuple[int, ...]] = {}
+        self._built_size: int = 0
+
+    @property
+    def grid_dims(self) -> int:
+        """Number of projected axes the grid currently uses."""
+        return len(self.directions)
+
+    def _cells(self, vectors: np.ndarray) -> np.ndarray:
+        if not len(self.directions):
+            return np.zeros((len(vectors), 0), dtype=np.int64)
+        projected = np.asarray(vectors, dtype=np.float64) @ self.directions.T
+        return np.floor(projected / self.threshold).astype(np.int64)
+
+    def _fit_directions(self, sample: np.ndarray, n_rows: int) -> np.ndarray:
+        """
+        Principal directions of `sample`, keeping the number of axes that minimises the
+        estimated query cost: 3 ** dims bucket lookups plus the expected candidates, where
+        each axis keeps about 3 * threshold / (4 * sigma) of the rows.
+        """
+        centered = sample - sample.mean(axis=0)
+        _, singular, vt = np.linalg.svd(centered, full_matrices=False)
+        sigma = singular / math.sqrt(max(len(sample) - 1, 1))
+        keep = np.minimum(1.0, 3 * self.threshold / np.maximum(4 * sigma, 1e-12))
+        best_dims, best_cost = 0, float(n_rows)
+        for dims in range(1, min(self.max_dims, len(sigma)) + 1):
+            cost = 3.0 ** dims + n_rows * float(np.prod(keep[:dims]))
+            if cost < best_cost:
+                best_dims, best_cost = dims, cost
+        return vt[:best_dims]
+
+    def build(self, rows: List[int], matrix: np.ndarray) -> None:
+        """
+        Re-fits the projection to the given rows and re-buckets them.
+
+        Args:
+            rows (List[int]): Rows to index.
+            matrix (np.ndarray): Template matrix.
+        """
+        rows = list(rows)
+        self.buckets, self.cells = {}, {}
+        self._built_size = len(rows)
+        if not rows:
+            self.directions = np.zeros((0, 0))
+            return
+        picked = rows if len(rows) <= self.sample_size else \
+            np.random.default_rng(0).choice(rows, self.sample_size, replace=False).tolist()
+        self.directions = self._fit_directions(np.asarray(matrix[sorted(picked)], dtype=np.float64), len(rows))
+        self._insert(rows, matrix)
+
+    def _insert(self, rows: List[int], matrix: np.ndarray) -> None:
+        for start in range(0, len(rows), 1 << 16):
+            block = rows[start:start + (1 << 16)]
+            for row, cell in zip(block, map(tuple, self._cells(matrix[block]).tolist())):
+                self.buckets.setdefault(cell, []).append(row)
+                self.cells[row] = cell
+
+    def add(self, rows: List[int], matrix: np.ndarray) -> None:
+        """
+        Indexes rows of the template matrix, re-fitting the projection once the
+        indexed set has doubled since the last fit.
+
+        Args:
+            rows (List[int]): Rows to index.
+            matrix (np.ndarray): Template matrix.
+        """
+        if len(self.cells) + len(rows) >= max(2 * self._built_size, 64):
+            self.build(list(self.cells) + list(rows), matrix)
+        else:
+            self._insert(list(rows), matrix)
+
+    def remove(self, row: int, matrix: np.ndarray) -> None:
+        """
+        Drops a row (e.g. a superseded template) from the index.
+
+        Args:
+            row (int): Row to drop.
+            matrix (np.ndarray): Template matrix.
+        """
+        self.buckets[self.cells.pop(row)].remove(row)
+
+    def query(self, vector: List[float], matrix: np.ndarray,
+              threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        """
+        Finds every indexed row within drift `threshold` of a template.
+
+        Args:
+            vector (List[float]): Biometric template to search for.
+            matrix (np.ndarray): Template matrix.
+            threshold (Optional[float]): Drift threshold, at most the index threshold.
+
+        Returns:
+            List[Tuple[int, float]]: (row, drift) pairs, closest first.
+        """
+        limit = self.threshold if threshold is None else min(threshold, self.threshold)
+        template = np.asarray(vector, dtype=np.float64)
+        cell = self._cells(template.reshape(1, -1))[0].tolist()
+        candidates = [
+            row for offset in itertools.product((-1, 0, 1), repeat=len(cell))
+            for row in self.buckets.get(tuple(c + o for c, o in zip(cell, offset)), ())
+        ]
+        if not candidates:
+            return []
+        rows = np.array(candidates)
+        drifts = np.abs(matrix[rows].astype(np.float64) - template).sum(axis=1)
+        return [(int(rows[i]), float(drifts[i])) for i in np.argsort(drifts) if drifts[i] < limit]
+
+
+class BiometricKYC:
+    """
+    "Feature Drift" matcher.
+    Enrolls and verifies biometric data with drift threshold.
+    Templates live in a TemplateStore (memory-mapped when `store_path` is given) and
+    are indexed for 1:N duplicate-identity search.
+    """
+    def __init__(self, threshold: float = 0.1, store_path: Optional[str] = None, dtype: str = 'float32') -> None:
+        self.threshold: float = threshold
+        self.stored: TemplateStore = TemplateStore(path=store_path, dtype=dtype)
+        self.index: TemplateIndex = TemplateIndex(threshold)
+        # Enrollments from concurrent request threads update the store and index together.
+        self._lock = threading.Lock()
+        if len(self.stored):
+            self.index.build(sorted(self.stored.rows.values()), self.stored.matrix)
+
+    def enroll(self, user_id: Any, bio_data: List[float]) -> None:
+        """
+        Stores biometric data for a user.
+        
+        Args:
+            user_id (Any): User identifier.
+            bio_data (List[float]): Biometric data.
+        """
+        with self._lock:
+            previous = self.stored.rows.get(user_id)
+            row = self.stored.append(user_id, bio_data)
+            if previous is not None:
+                self.index.remove(previous, self.stored.matrix)
+            self.index.add([row], self.stored.matrix)
+
+    def verify(self, user_id: Any, bio_data: List[float]) -> bool:
+        """
+        Verifies biometric data with drift threshold.
+        
+        Args:
+            user_id (Any): User identifier.
+            bio_data (List[float]): Biometric data to verify.
+            
+        Returns:
+            bool: True if verification passes, else False.
+        """
+        template = self.stored.get(user_id)
+        if template is None:
+            return False
+        drift = sum(abs(a - b) for a, b in zip(template.tolist(), bio_data))
+        return drift < self.threshold  # Threshold for match
+
+    def identify(self, bio_data: List[float], exclude: Optional[Any] = None) -> List[Any]:
+        """
+        1:N identification: returns every enrolled user within drift threshold.
+
+        Args:
+            bio_data (List[float]): Biometric data to search for.
+            exclude (Optional[Any]): User id to leave out, e.g. the applicant's own id.
+
+        Returns:
+            List[Any]: Matching user ids, closest first.
+        """
+        with self._lock:
+            matches = self.index.query(bio_data, self.stored.matrix)
+        return [self.stored.ids[row] for row, _ in matches if self.stored.ids[row] != exclude]
+
+
+class Predicate(ABC):
+    """
+    A compiled compliance condition on one applicant attribute.
+    """
+    def __init__(self, attribute: str) -> None:
+        self.attribute: str = attribute
+
+    @abstractmethod
+    def test(self, value: Any) -> bool:
+        """
+        Evaluates the condition on an attribute value.
+
+        Args:
+            value (Any): Applicant attribute value.
+
+        Returns:
+            bool: True if the condition holds.
+        """
+
+    def __call__(self, applicant: Dict[str, Any]) -> bool:
+        return self.attribute in applicant and self.test(applicant[self.attribute])
+
+
+class EqualsPredicate(Predicate):
+    """Attribute must equal a value."""
+    def __init__(self, attribute: str, value: Any) -> None:
+        super().__init__(attribute)
+        self.value: Any = value
+
+    def test(self, value: Any) -> bool:
+        return value == self.value
+
+
+class RangePredicate(Predicate):
+    """Attribute must lie within [low, high]; either bound may be open."""
+    def __init__(self, attribute: str, low: Optional[float] = None, high: Optional[float] = None) -> None:
+        super().__init__(attribute)
+        self.low: Optional[float] = low
+        self.high: Optional[float] = high
+
+    def test(self, value: Any) -> bool:
+        try:
+            return (self.low is None or value >= self.low) and (self.high is None or value <= self.high)
+        except TypeError:
+            return False
+
+
+class MembershipPredicate(Predicate):
+    """Attribute must be one of a set of values."""
+    def __init__(self, attribute: str, values: Any) -> None:
+        super().__init__(attribute)
+        self.values: set = set(values)
+
+    def test(self, value: Any) -> bool:
+        try:
+            return value in self.values
+        except TypeError:
+            return False
+
+
+def compile_conditions(conditions: Dict[str, Any]) -> List[Predicate]:
+    """
+    Compiles a contract's condition dict into predicates.
+
+    Supported forms:
+        'min_<attr>': x / 'max_<attr>': x   -> threshold on <attr>
+        '<attr>': {'min': x, 'max': y}      -> range
+        '<attr>': {'in': [...]} or [...]    -> set membership
+        '<attr>': x                         -> equality
+
+    Args:
+        conditions (Dict[str, Any]): Contract conditions.
+
+    Returns:
+        List[Predicate]: Compiled predicates.
+    """
+    predicates: List[Predicate] = []
+    for key, value in conditions.items():
+        if key.startswith('min_') and isinstance(value, (int, float)):
+            predicates.append(RangePredicate(key[4:], low=value))
+        elif key.startswith('max_') and isinstance(value, (int, float)):
+            predicates.append(RangePredicate(key[4:], high=value))
+        elif isinstance(value, dict) and 'in' in value:
+            predicates.append(MembershipPredicate(key, value['in']))
+        elif isinstance(value, dict) and ('min' in value or 'max' in value):
+            predicates.append(RangePredicate(key, value.get('min'), value.get('max')))
+        elif isinstance(value, (list, tuple, set)):
+            predicates.append(MembershipPredicate(key, value))
+        else:
+            predicates.append(EqualsPredicate(key, value))
+    return predicates
+
+
+class ComplianceSmartContract:
+    """
+    "Rule Lock" system.
+    Enforces compliance rules through smart contract-like mechanisms.
+
+    Conditions are compiled into predicates when a rule is set, and contracts are
+    indexed by the attributes they constrain, so evaluating an applicant only
+    touches contracts that mention one of the applicant's attributes. Every
+    `set_rule` call adds a new version; the latest one is enforced.
+    `check` keeps its original exact-match semantics; the predicate forms
+    (thresholds, ranges, membership) are applied by `satisfies` and `evaluate`.
+    """
+    def __init__(self) -> None:
+        self.rules: Dict[str, Dict[str, Any]] = {}
+        self.versions: Dict[str, List[Dict[str, Any]]] = {}
+        self.compiled: Dict[str, List[Predicate]] = {}
+        self.by_attribute: Dict[str, set] = {}
+
+    def set_rule(self, contract_id: str, conditions: Dict[str, Any]) -> int:
+        """
+        Sets compliance rules for a contract.
+        
+        Args:
+            contract_id (str): Contract identifier.
+            conditions (Dict[str, Any]): Conditions for the contract.
+
+        Returns:
+            int: Version number of the new rule (starting at 1).
+        """
+        for predicate in self.compiled.get(contract_id, []):
+            self.by_attribute[predicate.attribute].discard(contract_id)
+        # Keep a private copy so later edits to the caller's dict cannot rewrite history.
+        conditions = copy.deepcopy(conditions)
         self.rules[contract_id] = conditions
+        self.versions.setdefault(contract_id, []).append(conditions)
+        self.compiled[contract_id] = compile_conditions(conditions)
+        for predicate in self.compiled[contract_id]:
+            self.by_attribute.setdefault(predicate.attribute, set()).add(contract_id)
+        return len(self.versions[contract_id])
 
     def check(self, contract_id: str, conditions: Dict[str, Any]) -> bool:
         """
@@ -446,6 +2149,48 @@ class ComplianceSmartContract:
             return False
         return all(self.rules[contract_id].get(k) == v for k, v in conditions.items())
 
+    def satisfies(self, contract_id: str, applicant: Dict[str, Any]) -> bool:
+        """
+        Checks an applicant's attributes against a contract's compiled predicates.
+
+        Args:
+            contract_id (str): Contract identifier.
+            applicant (Dict[str, Any]): Applicant attributes.
+
+        Returns:
+            bool: True if the attributes satisfy every condition of the stored rule, else False.
+        """
+        if contract_id not in self.compiled:
+            return False
+        return all(predicate(applicant) for predicate in self.compiled[contract_id])
+
+    def applicable(self, applicant: Dict[str, Any]) -> set:
+        """
+        Returns the contracts that constrain at least one of the applicant's attributes.
+
+        Args:
+            applicant (Dict[str, Any]): Applicant attributes.
+
+        Returns:
+            set: Contract identifiers.
+        """
+        contracts: set = set()
+        for attribute in applicant:
+            contracts |= self.by_attribute.get(attribute, set())
+        return contracts
+
+    def evaluate(self, applicant: Dict[str, Any]) -> Dict[str, bool]:
+        """
+        Evaluates an applicant against every applicable contract.
+
+        Args:
+            applicant (Dict[str, Any]): Applicant attributes.
+
+        Returns:
+            Dict[str, bool]: Compliance verdict per applicable contract.
+        """
+        return {contract_id: self.satisfies(contract_id, applicant) for contract_id in self.applicable(applicant)}
+
 
 # ------------------------
 # Behavioral Analysis
@@ -500,15 +2245,100 @@ class SentimentAnalyzer:
                 for i in range(len(self.weights)):
                     self.weights[i] -= lr * error * math.sin(f[i])
 
+    def predict_batch(self, features: Any) -> np.ndarray:
+        """
+        Predicts sentiment scores for a whole feature matrix.
+
+        Args:
+            features (Any): (N, size) array or nested list of features.
+
+        Returns:
+            np.ndarray: Array of N normalized sentiment scores.
+        """
+        return sigmoid_array(np.sin(np.asarray(features, dtype=np.float64)) @ np.asarray(self.weights))
+
+    def train_batch(self, features_list: Any, targets: Any, epochs: int = 50, lr: float = 0.01,
+                    batch_size: int = 256, seed: Optional[int] = None) -> None:
+        """
+        Trains the sentiment model with vectorized mini-batch gradient descent.
+        sin(features) is computed once for the dataset; each step is a pair of matrix products.
+
+        Args:
+            features_list (Any): (N, size) training features.
+            targets (Any): N target sentiment scores.
+            epochs (int, optional): Number of training epochs.
+            lr (float, optional): Learning rate.
+            batch_size (int, optional): Number of samples per gradient step.
+            seed (Optional[int]): Seed for shuffling.
+        """
+        rng = np.random.default_rng(seed)
+        waves = np.sin(np.asarray(features_list, dtype=np.float64))
+        y = np.asarray(targets, dtype=np.float64)
+        w = np.asarray(self.weights, dtype=np.float64)
+        for _ in range(epochs):
+            perm = rng.permutation(len(y))
+            for start in range(0, len(perm), batch_size):
+                idx = perm[start:start + batch_size]
+                error = sigmoid_array(waves[idx] @ w) - y[idx]
+                w -= lr * (waves[idx].T @ error) / len(idx)
+        self.weights = w.tolist()
+
+
+def squared_distances(x: np.ndarray, centers: np.ndarray, center_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Squared Euclidean distances between rows of x and centers, via
+    ||x||^2 - 2 x.c + ||c||^2 as one matrix product.
+
+    Args:
+        x (np.ndarray): (N, d) points.
+        centers (np.ndarray): (k, d) centers.
+        center_norms (Optional[np.ndarray]): Precomputed ||c||^2 per center.
+
+    Returns:
+        np.ndarray: (N, k) squared distances, clipped at zero.
+    """
+    if center_norms is None:
+        center_norms = np.einsum('ij,ij->i', centers, centers)
+    distances = np.einsum('ij,ij->i', x, x)[:, None] - 2 * (x @ centers.T) + center_norms[None, :]
+    return np.maximum(distances, 0)
+
+
+def _cluster_sums(x: np.ndarray, labels: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-cluster point counts and coordinate sums, one bincount per dimension."""
+    counts = np.bincount(labels, minlength=k)
+    sums = np.column_stack([np.bincount(labels, weights=x[:, j], minlength=k) for j in range(x.shape[1])])
+    return counts, sums
+
 
 class LifestyleSegmenter:
     """
     "Affinity Grouping" for clustering.
     Uses a k-means-like algorithm to segment lifestyles.
+
+    `fit` runs vectorized Lloyd iterations from k-means++ seeds until the centers move
+    less than `tol`. `fit_minibatch` and `fit_file` update the centers from a stream of
+    batches (e.g. chunks read from disk) for datasets that do not fit in memory, seeding
+    from a reservoir sample of the whole stream rather than from its first batch.
     """
-    def __init__(self, n_groups: int = 3) -> None:
+    def __init__(self, n_groups: int = 3, max_iter: int = 100, tol: float = 1e-4, seed: Optional[int] = None) -> None:
         self.centers: Optional[List[List[float]]] = None
         self.n_groups: int = n_groups
+        self.max_iter: int = max_iter
+        self.tol: float = tol
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self._cache: Dict[str, np.ndarray] = {}
+        self._cache_key: Optional[List[List[float]]] = None
+
+    def _seed_centers(self, x: np.ndarray) -> np.ndarray:
+        """k-means++ seeding: each new center is drawn with probability proportional to D(x)^2."""
+        centers = [x[self.rng.integers(len(x))]]
+        closest = squared_distances(x, centers[0][None, :])[:, 0]
+        for _ in range(1, self.n_groups):
+            total = closest.sum()
+            index = self.rng.choice(len(x), p=closest / total) if total > 0 else self.rng.integers(len(x))
+            centers.append(x[index])
+            closest = np.minimum(closest, squared_distances(x, x[index][None, :])[:, 0])
+        return np.array(centers)
 
     def fit(self, data: List[List[float]]) -> None:
         """
@@ -517,16 +2347,151 @@ class LifestyleSegmenter:
         Args:
             data (List[List[float]]): Input data for clustering.
         """
-        self.centers = [data[i] for i in random.sample(range(len(data)), self.n_groups)]
-        for _ in range(5):
-            groups = [[] for _ in range(self.n_groups)]
-            for d in data:
-                distances = [sum((di - ci) ** 2 for di, ci in zip(d, c)) for c in self.centers]
-                group = distances.index(min(distances))
-                groups[group].append(d)
-            for i in range(self.n_groups):
-                if groups[i]:
-                    self.centers[i] = [sum(g[j] for g in groups[i]) / len(groups[i]) for j in range(len(data[0]))]
+        x = np.asarray(data, dtype=np.float64)
+        centers = self._seed_centers(x)
+        for _ in range(self.max_iter):
+            labels = squared_distances(x, centers).argmin(axis=1)
+            counts, sums = _cluster_sums(x, labels, self.n_groups)
+            updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+            shift = np.abs(updated - centers).max()
+            centers = updated
+            if shift < self.tol:
+                break
+        self.centers = centers.tolist()
+
+    def _reservoir(self, batches: Iterable[Any], size: int) -> Optional[np.ndarray]:
+        """Uniform sample of up to `size` points from one pass over `batches` (Algorithm R, batch at a time)."""
+        sample: Optional[np.ndarray] = None
+        seen = 0
+        for batch in batches:
+            x = np.asarray(batch, dtype=np.float64)
+            if sample is None:
+                sample = np.empty((size, x.shape[1]))
+            fill = min(max(size - seen, 0), len(x))
+            sample[seen:seen + fill] = x[:fill]
+            # Row t of the rest is point number seen + fill + t; it replaces a random slot with probability size / (number + 1).
+            slots = self.rng.integers(0, seen + fill + np.arange(len(x) - fill) + 1)
+            kept = np.nonzero(slots < size)[0]
+            if len(kept):
+                # Later points overwrite earlier ones in the same slot, as in the sequential algorithm.
+                last = len(kept) - 1 - np.unique(slots[kept][::-1], return_index=True)[1]
+                sample[slots[kept][last]] = x[fill + kept[last]]
+            seen += len(x)
+        return None if sample is None else sample[:min(seen, size)]
+
+    def fit_minibatch(self, batches: Iterable[Any], epochs: int = 1, sample_size: int = 10_000) -> None:
+        """
+        Fits centers from a stream of batches (mini-batch k-means).
+
+        When `batches` is re-iterable (a list or an object whose `__iter__` restarts the
+        stream), one extra pass draws a uniform reservoir sample of `sample_size` points and
+        the centers are k-means++ seeded from it; a one-shot iterator is seeded from its
+        first batch. Counts restart every epoch, so within an epoch each center moves to the
+        running mean of the points assigned to it in that epoch, and later epochs can still
+        correct early assignments. With `epochs` > 1, `batches` must be re-iterable; fitting
+        stops early once an epoch moves the centers less than `tol`.
+
+        Args:
+            batches (Iterable[Any]): Iterable of (n, d) arrays.
+            epochs (int, optional): Passes over the batches.
+            sample_size (int, optional): Reservoir size for seeding.
+        """
+        centers: Optional[np.ndarray] = None
+        if not isinstance(batches, Iterator):
+            sample = self._reservoir(batches, sample_size)
+            if sample is None:
+                return
+            centers = self._seed_centers(sample)
+        for _ in range(epochs):
+            counts = np.zeros(self.n_groups)
+            start = None if centers is None else centers.copy()
+            for batch in batches:
+                x = np.asarray(batch, dtype=np.float64)
+                if centers is None:
+                    centers = self._seed_centers(x)
+                    start = centers.copy()
+                labels = squared_distances(x, centers).argmin(axis=1)
+                batch_counts, sums = _cluster_sums(x, labels, self.n_groups)
+                seen = batch_counts > 0
+                total = counts + batch_counts
+                centers[seen] = (centers[seen] * counts[seen, None] + sums[seen]) / total[seen, None]
+                counts = total
+            if centers is None or np.abs(centers - start).max() < self.tol:
+                break
+        if centers is not None:
+            self.centers = centers.tolist()
+
+    def fit_file(self, path: str, chunk_rows: int = 100_000, epochs: int = 3, sample_size: int = 10_000) -> None:
+        """
+        Fits centers by streaming a data file from disk in chunks, visiting the chunks in
+        a fresh random order on every pass.
+        A CSV file is parsed once into a temporary binary spool so chunks can be read in
+        any order; a .npy file is memory-mapped directly.
+
+        Args:
+            path (str): .npy file (memory-mapped) or CSV file, one point per row.
+            chunk_rows (int, optional): Rows per mini-batch.
+            epochs (int, optional): Passes over the file.
+            sample_size (int, optional): Reservoir size for seeding.
+        """
+        rng = self.rng
+
+        class _Chunks:
+            def __init__(self, data: np.ndarray) -> None:
+                self.data = data
+
+            def __iter__(self) -> Iterator[np.ndarray]:
+                starts = rng.permutation(np.arange(0, len(self.data), chunk_rows))
+                return (self.data[start:start + chunk_rows] for start in starts.tolist())
+
+        if path.endswith('.npy'):
+            self.fit_minibatch(_Chunks(np.load(path, mmap_mode='r')), epochs, sample_size)
+            return
+        with tempfile.TemporaryFile() as spool:
+            dim = None
+            for _, block in _iter_csv_blocks(path, chunk_rows):
+                dim = block.shape[1]
+                spool.write(np.ascontiguousarray(block, dtype=np.float64).tobytes())
+            if dim is None:
+                return
+            spool.flush()
+            data = np.memmap(spool, dtype=np.float64, mode='r', shape=(spool.tell() // (8 * dim), dim))
+            self.fit_minibatch(_Chunks(data), epochs, sample_size)
+            del data
+
+    def _center_cache(self) -> Dict[str, np.ndarray]:
+        """Center array and squared norms, rebuilt only when `centers` is replaced."""
+        if self.centers is None:
+            raise ValueError("LifestyleSegmenter.fit() must be called before predicting")
+        if self._cache_key is not self.centers:
+            centers = np.asarray(self.centers, dtype=np.float64)
+            self._cache = {'centers': centers, 'norms': np.einsum('ij,ij->i', centers, centers)}
+            self._cache_key = self.centers
+        return self._cache
+
+    def predict_batch(self, data: Any) -> np.ndarray:
+        """
+        Assigns many points to their nearest centers with one matrix product per block of
+        rows, using cached center norms (||x||^2 - 2 x.c + ||c||^2). Rows are processed in
+        blocks so the distance matrix stays around a million entries for any k.
+
+        Args:
+            data (Any): (N, d) array or nested list of points.
+
+        Returns:
+            np.ndarray: Group index per point.
+
+        Raises:
+            ValueError: If the segmenter has not been fitted.
+        """
+        cache = self._center_cache()
+        x = np.asarray(data, dtype=np.float64).reshape(-1, cache['centers'].shape[1])
+        labels = np.empty(len(x), dtype=np.int64)
+        block = max(1, 1_000_000 // len(cache['centers']))
+        for start in range(0, len(x), block):
+            labels[start:start + block] = squared_distances(
+                x[start:start + block], cache['centers'], cache['norms']).argmin(axis=1)
+        return labels
 
     def predict(self, data: List[float]) -> int:
         """
@@ -538,52 +2503,195 @@ class LifestyleSegmenter:
         Returns:
             int: Assigned group index.
         """
-        distances = [sum((di - ci) ** 2 for di, ci in zip(data, c)) for c in self.centers]
-        return distances.index(min(distances))
+        return int(self.predict_batch([data])[0])
 
 
 class StabilityForecaster:
     """
     "Trend Echo" predictor.
     Forecasts stability by maintaining a memory of weighted inputs.
+
+    Each user has their own memory: one row of a preallocated (users x window) ring
+    buffer plus a write position, so an echo is a single in-place write. Calls without
+    a user id share one anonymous row.
     """
-    def __init__(self, size: int = 3) -> None:
-        self.memory: List[float] = [0] * size
+    def __init__(self, size: int = 3, capacity: int = 1024) -> None:
         self.weights: List[float] = [random.uniform(-1, 1) for _ in range(size)]
+        self.window: int = size
+        self.index: Dict[Any, int] = {None: 0}
+        self.ring: np.ndarray = np.zeros((max(capacity, 1), size))
+        self.heads: np.ndarray = np.zeros(max(capacity, 1), dtype=np.int64)
+
+    def _row(self, user_id: Any) -> int:
+        row = self.index.get(user_id)
+        if row is None:
+            row = len(self.index)
+            if row == len(self.ring):
+                self.ring = np.vstack([self.ring, np.zeros_like(self.ring)])
+                self.heads = np.concatenate([self.heads, np.zeros_like(self.heads)])
+            self.index[user_id] = row
+        return row
 
-    def echo(self, data: List[float]) -> float:
+    def history(self, user_id: Any = None) -> List[float]:
+        """
+        Returns a user's memory, oldest value first.
+
+        Args:
+            user_id (Any, optional): User identifier.
+
+        Returns:
+            List[float]: Memory values.
+        """
+        row = self.index.get(user_id)
+        if row is None:
+            return [0.0] * self.window
+        return np.roll(self.ring[row], -self.heads[row]).tolist()
+
+    @property
+    def memory(self) -> List[float]:
+        """Memory of the anonymous (shared) row, oldest value first."""
+        return self.history(None)
+
+    def echo(self, data: List[float], user_id: Any = None) -> float:
         """
         Updates memory with weighted data.
         
         Args:
             data (List[float]): Input data.
+            user_id (Any, optional): User whose memory to update.
             
         Returns:
             float: Latest memory value.
         """
-        self.memory = self.memory[1:] + [sum(w * d for w, d in zip(self.weights, data))]
-        return self.memory[-1]
+        value = sum(w * d for w, d in zip(self.weights, data))
+        row = self._row(user_id)
+        self.ring[row, self.heads[row]] = value
+        self.heads[row] = (self.heads[row] + 1) % self.window
+        return value
 
-    def predict(self, data: List[float]) -> float:
+    def predict(self, data: List[float], user_id: Any = None) -> float:
         """
         Predicts stability score.
         
         Args:
             data (List[float]): Input data.
+            user_id (Any, optional): User whose memory to update.
             
         Returns:
             float: Normalized stability score.
         """
-        return sigmoid(self.echo(data))
+        return sigmoid(self.echo(data, user_id))
+
+    def predict_batch(self, user_ids: List[Any], data: Any) -> np.ndarray:
+        """
+        Updates many users' memories in one vectorized step and predicts their stability.
+        A user appearing several times is updated once per occurrence, in order.
+
+        Args:
+            user_ids (List[Any]): User identifier per row.
+            data (Any): (N, size) array or nested list of input data.
+
+        Returns:
+            np.ndarray: Normalized stability score per row.
+        """
+        values = np.asarray(data, dtype=np.float64) @ np.asarray(self.weights)
+        rows = np.array([self._row(user_id) for user_id in user_ids], dtype=np.int64)
+        # Occurrence rank of each row among equal user ids, so repeats are written in turn.
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        group_start = np.r_[0, np.nonzero(np.diff(sorted_rows))[0] + 1]
+        rank = np.empty(len(rows), dtype=np.int64)
+        rank[order] = np.arange(len(rows)) - np.repeat(group_start, np.diff(np.r_[group_start, len(rows)]))
+        for r in range(int(rank.max()) + 1 if len(rows) else 0):
+            pick = rank == r
+            target = rows[pick]
+            self.ring[target, self.heads[target]] = values[pick]
+            self.heads[target] = (self.heads[target] + 1) % self.window
+        return sigmoid_array(values)
+
+
+class PrivacyBudget:
+    """
+    Compact per-user privacy-budget ledger.
+    Cumulative epsilon and delta spend live in flat arrays indexed through a
+    user id -> row dict; releases compose sequentially (spend adds up).
+    """
+    def __init__(self, epsilon_limit: float = 1.0, delta_limit: float = 1e-5, capacity: int = 1024) -> None:
+        self.epsilon_limit: float = epsilon_limit
+        self.delta_limit: float = delta_limit
+        self.index: Dict[Any, int] = {}
+        self.epsilon_spent: np.ndarray = np.zeros(capacity)
+        self.delta_spent: np.ndarray = np.zeros(capacity)
+
+    def rows(self, user_ids: List[Any]) -> np.ndarray:
+        """
+        Returns (allocating if needed) the ledger row of each user.
+
+        Args:
+            user_ids (List[Any]): User identifiers.
+
+        Returns:
+            np.ndarray: Row per user.
+        """
+        for user_id in user_ids:
+            if user_id not in self.index:
+                if len(self.index) == len(self.epsilon_spent):
+                    self.epsilon_spent = np.concatenate([self.epsilon_spent, np.zeros_like(self.epsilon_spent)])
+                    self.delta_spent = np.concatenate([self.delta_spent, np.zeros_like(self.delta_spent)])
+                self.index[user_id] = len(self.index)
+        return np.array([self.index[user_id] for user_id in user_ids], dtype=np.int64)
+
+    def charge(self, user_ids: List[Any], epsilon: float, delta: float = 0.0) -> None:
+        """
+        Records one release per listed user, refusing if any user would exceed the limits.
+
+        Args:
+            user_ids (List[Any]): User identifiers (repeats are charged per occurrence).
+            epsilon (float): Epsilon spent per release.
+            delta (float, optional): Delta spent per release.
+
+        Raises:
+            ValueError: If any user's budget would be exceeded; nothing is charged.
+        """
+        rows, releases = np.unique(self.rows(user_ids), return_counts=True)
+        epsilon_after = self.epsilon_spent[rows] + releases * epsilon
+        delta_after = self.delta_spent[rows] + releases * delta
+        over = (epsilon_after > self.epsilon_limit + 1e-12) | (delta_after > self.delta_limit + 1e-18)
+        if over.any():
+            raise ValueError(f"Privacy budget exhausted for {int(over.sum())} user(s)")
+        self.epsilon_spent[rows] = epsilon_after
+        self.delta_spent[rows] = delta_after
+
+    def remaining(self, user_id: Any) -> Tuple[float, float]:
+        """
+        Returns a user's remaining (epsilon, delta) budget.
+
+        Args:
+            user_id (Any): User identifier.
+
+        Returns:
+            Tuple[float, float]: Remaining epsilon and delta.
+        """
+        row = self.index.get(user_id)
+        if row is None:
+            return self.epsilon_limit, self.delta_limit
+        return float(self.epsilon_limit - self.epsilon_spent[row]), float(self.delta_limit - self.delta_spent[row])
 
 
 class EthicalAI:
     """
     "Privacy Veil" noise.
     Adds random noise to data for privacy preservation.
+
+    Noise comes from a seedable NumPy Generator and is drawn for a whole matrix at
+    once. `veil_matrix` calibrates Laplace or Gaussian noise to (epsilon, delta) and
+    charges each user's release against a PrivacyBudget.
     """
-    def __init__(self, strength: float = 1.0) -> None:
+    def __init__(self, strength: float = 1.0, seed: Optional[int] = None,
+                 budget: Optional[PrivacyBudget] = None) -> None:
         self.strength: float = strength
+        self.rng: np.random.Generator = np.random.default_rng(seed)
+        self.budget: PrivacyBudget = budget if budget is not None else PrivacyBudget()
 
     def veil(self, data: List[float]) -> List[float]:
         """
@@ -595,8 +2703,57 @@ class EthicalAI:
         Returns:
             List[float]: Data with added noise.
         """
-        noise = [random.uniform(-self.strength, self.strength) for _ in data]
-        return [d + n for d, n in zip(data, noise)]
+        values = np.asarray(data, dtype=np.float64)
+        return (values + self.rng.uniform(-self.strength, self.strength, size=values.shape)).tolist()
+
+    def veil_matrix(self, matrix: Any, epsilon: float, delta: float = 0.0, sensitivity: float = 1.0,
+                    mechanism: str = 'laplace', user_ids: Optional[List[Any]] = None) -> np.ndarray:
+        """
+        Adds calibrated noise to every row of a matrix in one draw.
+
+        Laplace noise has scale sensitivity / epsilon, with `sensitivity` the L1
+        sensitivity of one row. Gaussian noise has
+        sigma = sensitivity * sqrt(2 ln(1.25 / delta)) / epsilon, with `sensitivity` the L2
+        sensitivity of one row; this calibration only holds for epsilon < 1, so larger
+        epsilons are rejected.
+
+        Args:
+            matrix (Any): (N, d) array or nested list, one row per user.
+            epsilon (float): Privacy parameter per release.
+            delta (float, optional): Failure probability (Gaussian mechanism only).
+            sensitivity (float, optional): Sensitivity of one row.
+            mechanism (str, optional): 'laplace' or 'gaussian'.
+            user_ids (Optional[List[Any]]): User per row, charged against the privacy budget.
+
+        Returns:
+            np.ndarray: Noised matrix.
+
+        Raises:
+            ValueError: On invalid parameters or if a user's budget is exhausted.
+        """
+        values = np.asarray(matrix, dtype=np.float64)
+        if epsilon <= 0:
+            raise ValueError("epsilon must be positive")
+        if mechanism == 'laplace':
+            delta = 0.0
+        elif mechanism == 'gaussian':
+            if not 0 < delta < 1:
+                raise ValueError("The Gaussian mechanism needs 0 < delta < 1")
+            if epsilon >= 1:
+                raise ValueError("The Gaussian mechanism's calibration needs epsilon < 1")
+        else:
+            raise ValueError(f"Unknown mechanism: {mechanism}")
+        if user_ids is not None:
+            if values.ndim == 0 or len(user_ids) != len(values):
+                raise ValueError(f"Expected one user id per row ({len(values) if values.ndim else 0}), got {len(user_ids)}")
+            # Charge before drawing, so no noised release exists for a refused request.
+            self.budget.charge(user_ids, epsilon, delta)
+        if mechanism == 'laplace':
+            noise = self.rng.laplace(0.0, sensitivity / epsilon, size=values.shape)
+        else:
+            sigma = sensitivity * math.sqrt(2 * math.log(1.25 / delta)) / epsilon
+            noise = self.rng.normal(0.0, sigma, size=values.shape)
+        return values + noise
 
 
 def utility_function(x: float, alpha: float = 0.88, beta: float = 0.88, lambda_: float = 2.25) -> float: